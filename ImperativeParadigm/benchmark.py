@@ -0,0 +1,175 @@
+# benchmark.py
+# Usage: python benchmark.py [size_mb]   (default 1024 -> ~1GB input)
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from pipeline import (
+    load_csv, iter_csv, handle_missing, standardize_dates, standardize_numbers,
+    filter_rows, compute_sales_growth, aggregate_sum_by_key, analyze_statistics
+)
+from dedup import Deduplicator
+from fast_csv import load_columns_mmap
+from validation import compile_schema, validate
+from sinks import CsvSink, SqliteSink
+from cache import StageCache, file_digest, run_stages
+
+SCHEMA = {
+    "Date": {"type": "date", "min_date": "2000-01-01", "max_date": "2100-12-31"},
+    "Region": {"allowed": ["North", "South", "East", "West", "West, Coast"]},
+    "Sales": {"type": "float", "non_negative": True},
+    "PreviousSales": {"type": "float", "non_negative": True},
+}
+
+HEADER = "Date,Region,Sales,PreviousSales,Product\n"
+SAMPLE_ROWS = [
+    "2025-01-01,North,1500,1200,WidgetA\n",
+    "01/02/2025,South,950,1000,WidgetB\n",
+    "2025-03-05,East,2000,1800,WidgetC\n",
+    "05-03-2025,North,3000,2500,WidgetA\n",
+] * 50 + ['2025-03-07,"West, Coast",,1100,"Widget ""D"""\n']
+REGIONS = ["North", "South", "East", "West"]
+DISTINCT_ROWS = 300_000
+FILL_VALUES = {"Date": "UNKNOWN", "Region": "UNKNOWN", "Sales": 0.0, "PreviousSales": 0.0,
+               "Product": "UNKNOWN", "SalesGrowth": 0.0}
+REPEAT = 5  # rounds for the validation overhead; the best of each side is kept
+
+
+def make_input(path, size_mb):
+    """Write a synthetic input.csv of roughly size_mb megabytes."""
+    block = "".join(SAMPLE_ROWS) * 100
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(HEADER)
+        while written < target:
+            f.write(block)
+            written += len(block)
+
+
+def make_distinct_input(path, n_rows):
+    """
+    Worst case for the distinct-value checks: every row has its own Sales and
+    PreviousSales, and Date cycles through ~73k strings (ISO and DD/MM/YYYY).
+    """
+    start = date(2000, 1, 1)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(HEADER)
+        for i in range(n_rows):
+            day = start + timedelta(days=i % 36500)
+            text = day.isoformat() if i % 2 else day.strftime("%d/%m/%Y")
+            f.write(f"{text},{REGIONS[i % 4]},{i * 0.37:.2f},{i * 0.29:.2f},Widget{i % 97}\n")
+
+
+def make_quoted_input(path, source):
+    """source rewritten with every field quoted, as spreadsheet and database exports write it."""
+    with open(source, encoding="utf-8", newline="") as src, open(path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f, quoting=csv.QUOTE_ALL).writerows(csv.reader(src))
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:8.2f}s")
+    return result
+
+
+def best_of(fns, repeat=REPEAT):
+    """
+    Fastest time of each fn over repeat rounds. The fns take turns within
+    a round, so other load on the machine slows them alike.
+    """
+    best = [float("inf")] * len(fns)
+    for _ in range(repeat):
+        for i, fn in enumerate(fns):
+            start = time.perf_counter()
+            fn()
+            best[i] = min(best[i], time.perf_counter() - start)
+    return best
+
+
+def run_pipeline(path, checks=None):
+    """The in-memory path of main.main() without the outputs; checks=None skips validation."""
+    with Deduplicator(key_fields=["Date", "Region", "Product"]) as dedup:
+        rows = list(dedup.iter_unique(iter_csv(path)))
+    if checks is not None:
+        rows, _ = validate(rows, checks)
+    null_masks = {}
+    rows = handle_missing(rows, fill_values=FILL_VALUES, null_masks=null_masks)
+    rows = standardize_dates(rows, ["Date"])
+    rows = standardize_numbers(rows, ["Sales", "PreviousSales"], precision=2)
+    rows = filter_rows(rows, lambda r: float(r.get("Sales", 0)) > 1000, null_masks=null_masks)
+    rows = compute_sales_growth(rows, null_masks=null_masks)
+    aggregate_sum_by_key(rows, key_field="Region", sum_field="Sales")
+    analyze_statistics(rows, ["Sales", "SalesGrowth"], exclude_masks=null_masks, percentiles=[25, 75])
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "input.csv")
+        make_input(path, size_mb)
+        print(f"Input: {os.path.getsize(path) / 1024 / 1024:.0f} MB")
+
+        rows = timed("csv.DictReader (all columns)", lambda: load_csv(path))
+        n = len(rows)
+        del rows
+        rows = timed("mmap (all columns)", lambda: load_csv(path, backend="mmap"))
+        assert len(rows) == n
+        checks = compile_schema(SCHEMA)
+        timed("validate (compiled schema)", lambda: validate(rows, checks))
+
+        distinct_path = os.path.join(tmp, "distinct.csv")
+        make_distinct_input(distinct_path, DISTINCT_ROWS)
+        distinct_rows = timed(f"csv.DictReader ({DISTINCT_ROWS} distinct rows)", lambda: load_csv(distinct_path))
+        timed("validate (high-cardinality Sales, Date)", lambda: validate(distinct_rows, checks))
+        del distinct_rows
+        # every distinct row passes the schema, so validation removes no work downstream
+        plain, checked = best_of([lambda: run_pipeline(distinct_path), lambda: run_pipeline(distinct_path, checks)])
+        print(f"{'pipeline (distinct rows, no validate)':<40} {plain:8.2f}s")
+        print(f"{'pipeline (distinct rows, validate)':<40} {checked:8.2f}s")
+        print(f"{'validate overhead':<40} {(checked / plain - 1) * 100:7.1f}%")
+
+        quoted_path = os.path.join(tmp, "quoted.csv")
+        make_quoted_input(quoted_path, distinct_path)
+        quoted_rows = timed(f"csv.DictReader ({DISTINCT_ROWS} quoted rows)", lambda: load_csv(quoted_path))
+        n_quoted = len(quoted_rows)
+        del quoted_rows
+        quoted_rows = timed(f"mmap ({DISTINCT_ROWS} quoted rows)", lambda: load_csv(quoted_path, backend="mmap"))
+        assert len(quoted_rows) == n_quoted
+        del quoted_rows
+
+        def write_with(sink):
+            with sink:
+                sink.write_rows("clean_data", rows, indexes=["Date", "Region"])
+            return sink
+
+        timed("sink: csv", lambda: write_with(CsvSink(tmp)))
+        timed("sink: sqlite", lambda: write_with(SqliteSink(os.path.join(tmp, "rollback.db"), "bench")))
+        timed("sink: sqlite (WAL)", lambda: write_with(SqliteSink(os.path.join(tmp, "wal.db"), "bench", wal=True)))
+        del rows
+        timed("mmap (Region, Sales)", lambda: load_csv(path, backend="mmap", columns=["Region", "Sales"]))
+        timed("mmap columnar (Sales as floats)",
+              lambda: load_columns_mmap(path, columns=["Region", "Sales"], numeric_columns=["Sales"]))
+
+        stages = [
+            ("load", None, lambda _: load_csv(path, backend="mmap")),
+            ("handle_missing", {"fill_values": {"Sales": 0.0, "PreviousSales": 0.0}},
+             lambda rows: handle_missing(rows, fill_values={"Sales": 0.0, "PreviousSales": 0.0})),
+            ("standardize_dates", {"date_fields": ["Date"]}, lambda rows: standardize_dates(rows, ["Date"])),
+            ("standardize_numbers", {"numeric_fields": ["Sales", "PreviousSales"], "precision": 2},
+             lambda rows: standardize_numbers(rows, ["Sales", "PreviousSales"], precision=2)),
+        ]
+        cache = StageCache(os.path.join(tmp, "cache"), max_bytes=1 << 40)
+        input_key = timed("input digest", lambda: file_digest(path))
+        timed("stages 1-4 (no cache)", lambda: run_stages(None, input_key, stages))
+        timed("stages 1-4 (cold cache)", lambda: run_stages(cache, input_key, stages))
+        timed("stages 1-4 (warm cache)", lambda: run_stages(cache, input_key, stages))
+
+
+if __name__ == "__main__":
+    main()
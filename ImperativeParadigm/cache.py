@@ -0,0 +1,150 @@
+# cache.py
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import zlib
+
+# Content-addressed cache of stage outputs.
+#
+# Each stage's key hashes its parent's key, the stage name and its params,
+# and the chain starts from a digest of the input file's bytes. A key
+# therefore names the exact data and parameters that produced a result:
+# changing fill_values changes the handle_missing key and every key after
+# it, while the stages before it keep their keys. run_stages() looks for
+# the deepest stage already cached and only runs the stages after it.
+#
+# Entries are pickled and zlib-compressed, one file per key. Reads touch
+# the file's mtime, and writes evict the least recently used files until
+# the cache fits in max_bytes.
+
+CACHE_VERSION = 2  # bump when a stage's code changes what it returns
+READ_CHUNK = 8 * 1024 * 1024
+COMPRESS_LEVEL = 1  # fast; stage outputs are mostly repeated field values
+
+
+def file_digest(path):
+    """blake2b hex digest of a file's contents."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def stage_key(parent_key, stage, params=None):
+    """Key for stage given its parent's key; params must be JSON-serializable (repr is the fallback)."""
+    payload = json.dumps([CACHE_VERSION, parent_key, stage, params], sort_keys=True, default=repr)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class StageCache:
+    """On-disk LRU store of stage outputs, capped at max_bytes."""
+
+    SUFFIX = ".pkl.z"
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + self.SUFFIX)
+
+    def get(self, key, default=None):
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            value = pickle.loads(zlib.decompress(data))
+        except FileNotFoundError:
+            return default
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError):
+            # truncated / corrupt entry: drop it and recompute
+            self.discard(key)
+            return default
+        os.utime(path)  # mark as recently used
+        return value
+
+    def put(self, key, value):
+        data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), COMPRESS_LEVEL)
+        # write then rename, so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def discard(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def entries(self):
+        """[(mtime, size, path)] of cached entries, least recently used first."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def run_stages(cache, input_key, stages):
+    """
+    Run stages in order, resuming after the deepest cached one.
+    stages: [(name, params, fn)], fn(value) -> value; the first fn gets None
+    (it loads the input that input_key was computed from).
+    Each stage's output is cached under its chained key (cache=None runs everything).
+    Returns (value, resumed_from): the name of the cached stage the run
+    started after, or None if every stage ran.
+    """
+    keys = []
+    key = input_key
+    for name, params, _ in stages:
+        key = stage_key(key, name, params)
+        keys.append(key)
+
+    start = 0
+    value = None
+    resumed_from = None
+    if cache is not None:
+        missing = object()
+        for i in range(len(stages) - 1, -1, -1):
+            cached = cache.get(keys[i], missing)
+            if cached is not missing:
+                start = i + 1
+                value = cached
+                resumed_from = stages[i][0]
+                break
+
+    for (name, params, fn), key in zip(stages[start:], keys[start:]):
+        value = fn(value)
+        if cache is not None:
+            cache.put(key, value)
+    return value, resumed_from
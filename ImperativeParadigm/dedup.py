@@ -0,0 +1,152 @@
+# dedup.py
+import heapq
+import mmap
+import tempfile
+from array import array
+from bisect import bisect_left
+from hashlib import blake2b
+
+# Duplicate-row removal keyed on a subset of columns.
+# Each row is reduced to a 64-bit fingerprint of its key fields. Recent
+# fingerprints live in an in-memory set; once the set holds max_in_memory
+# entries it is written to disk as a sorted run of uint64 and cleared.
+# Spilled runs are searched with a binary search over an mmap, behind an
+# optional Bloom filter so most new rows never touch the disk.
+# Rows with an empty key field cannot be identified and are always kept.
+
+SEP = b"\x1f"
+MAX_RUNS = 16  # merge spilled runs into one beyond this many
+
+
+def row_fingerprint(row, key_fields):
+    key = SEP.join(str(row.get(f, "")).encode("utf-8") for f in key_fields)
+    return int.from_bytes(blake2b(key, digest_size=8).digest(), "little")
+
+
+class BloomFilter:
+    def __init__(self, n_bits, n_hashes=4):
+        self.n_bits = n_bits
+        self.n_hashes = n_hashes
+        self.bits = bytearray((n_bits + 7) // 8)
+
+    def _positions(self, fp):
+        # double hashing on the two halves of the 64-bit fingerprint
+        h1 = fp & 0xFFFFFFFF
+        h2 = (fp >> 32) | 1
+        for i in range(self.n_hashes):
+            yield (h1 + i * h2) % self.n_bits
+
+    def add(self, fp):
+        for p in self._positions(fp):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, fp):
+        for p in self._positions(fp):
+            if not self.bits[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+
+class Deduplicator:
+    """
+    key_fields: columns that identify a row (e.g. Date, Region, Product)
+    max_in_memory: fingerprints kept in memory before spilling a sorted run
+    bloom_bits: size of the Bloom filter in front of the spilled runs (0 = off)
+    spill_dir: where runs are written (default: system temp dir)
+    """
+
+    def __init__(self, key_fields, max_in_memory=1_000_000, bloom_bits=1 << 23, spill_dir=None):
+        self.key_fields = list(key_fields)
+        self.max_in_memory = max(1, max_in_memory)
+        self.bloom = BloomFilter(bloom_bits) if bloom_bits else None
+        self.spill_dir = spill_dir
+        self.current = set()
+        self.runs = []  # (file, mmap, uint64 view)
+        self.dropped = 0
+
+    def _write_run(self, fingerprints):
+        """Write sorted fingerprints to a temp file and map it back as uint64."""
+        f = tempfile.TemporaryFile(dir=self.spill_dir)
+        buf = array("Q")
+        for fp in fingerprints:
+            buf.append(fp)
+            if len(buf) >= 65536:
+                buf.tofile(f)
+                buf = array("Q")
+        buf.tofile(f)
+        f.flush()
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return f, mm, memoryview(mm).cast("Q")
+
+    def _spill(self):
+        run = sorted(self.current)
+        self.runs.append(self._write_run(run))
+        if self.bloom is not None:
+            for fp in run:
+                self.bloom.add(fp)
+        self.current = set()
+        if len(self.runs) > MAX_RUNS:
+            # k-way merge of the sorted runs keeps lookups at one binary search
+            old = self.runs
+            self.runs = [self._write_run(heapq.merge(*(view for _, _, view in old)))]
+            for f, mm, view in old:
+                view.release()
+                mm.close()
+                f.close()
+
+    def _in_runs(self, fp):
+        if self.bloom is not None and fp not in self.bloom:
+            return False
+        for _, _, view in self.runs:
+            i = bisect_left(view, fp)
+            if i < len(view) and view[i] == fp:
+                return True
+        return False
+
+    def is_duplicate(self, row):
+        """True if an earlier row had the same key; otherwise remember this one."""
+        for f in self.key_fields:
+            if row.get(f) in (None, ""):
+                return False
+        fp = row_fingerprint(row, self.key_fields)
+        if fp in self.current or (self.runs and self._in_runs(fp)):
+            self.dropped += 1
+            return True
+        self.current.add(fp)
+        if len(self.current) >= self.max_in_memory:
+            self._spill()
+        return False
+
+    def iter_unique(self, rows):
+        """Streaming path: yield the first occurrence of each key."""
+        for r in rows:
+            if not self.is_duplicate(r):
+                yield r
+
+    def close(self):
+        for f, mm, view in self.runs:
+            view.release()
+            mm.close()
+            f.close()
+        self.runs = []
+        self.current = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def drop_duplicates(rows, key_fields, report=None, **options):
+    """
+    List path: return rows without repeated keys (first occurrence wins).
+    report: optional dict, filled with {"dropped": n, "spilled_runs": k}
+    options: passed to Deduplicator (max_in_memory, bloom_bits, spill_dir)
+    """
+    with Deduplicator(key_fields, **options) as dedup:
+        out = list(dedup.iter_unique(rows))
+        if report is not None:
+            report["dropped"] = dedup.dropped
+            report["spilled_runs"] = len(dedup.runs)
+    return out
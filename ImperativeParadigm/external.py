@@ -0,0 +1,203 @@
+# external.py
+import heapq
+import math
+import pickle
+import tempfile
+from itertools import groupby
+from utils import safe_float
+
+# Out-of-core sort and group-by for inputs larger than RAM.
+# Items are buffered up to max_in_memory; a full buffer is sorted and
+# spilled to a temp file as a run, and the runs are combined with a
+# k-way merge (heapq.merge) that holds one item per run in memory.
+
+BATCH = 4096  # items pickled per record in a run file
+
+
+class SortedRuns:
+    """Sorted temp-file runs of items; iterate with merged()."""
+
+    def __init__(self, key=None, spill_dir=None):
+        self.key = key
+        self.spill_dir = spill_dir
+        self.files = []
+
+    def spill(self, items):
+        """Sort items and write them as a new run."""
+        items.sort(key=self.key)
+        f = tempfile.TemporaryFile(dir=self.spill_dir)
+        for i in range(0, len(items), BATCH):
+            pickle.dump(items[i:i + BATCH], f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.files.append(f)
+
+    def _read_run(self, f):
+        f.seek(0)
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+    def merged(self, tail=None):
+        """All runs (plus the already sorted list tail) as one sorted stream."""
+        streams = [self._read_run(f) for f in self.files]
+        if tail:
+            streams.append(iter(tail))
+        return heapq.merge(*streams, key=self.key)
+
+    def close(self):
+        for f in self.files:
+            f.close()
+        self.files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Spool:
+    """
+    Append-only temp file for a stream of items too large for RAM.
+    extend() adds items; iterating reads all of them back from the start
+    (finish one iteration before the next extend()).
+    """
+
+    def __init__(self, spill_dir=None):
+        self.file = tempfile.TemporaryFile(dir=spill_dir)
+        self.count = 0
+
+    def extend(self, items):
+        items = list(items)
+        self.file.seek(0, 2)
+        for i in range(0, len(items), BATCH):
+            pickle.dump(items[i:i + BATCH], self.file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.count += len(items)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        self.file.seek(0)
+        while True:
+            try:
+                batch = pickle.load(self.file)
+            except EOFError:
+                return
+            yield from batch
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def external_sort(values, max_in_memory=1_000_000, key=None, spill_dir=None):
+    """Yield values in sorted order, holding at most max_in_memory of them."""
+    with SortedRuns(key=key, spill_dir=spill_dir) as runs:
+        buf = []
+        for v in values:
+            buf.append(v)
+            if len(buf) >= max_in_memory:
+                runs.spill(buf)
+                buf = []
+        buf.sort(key=key)
+        yield from runs.merged(tail=buf)
+
+
+def group_sort_key(item):
+    # keys may be None for short rows; None sorts after every string
+    k = item[0]
+    return (k is None, "" if k is None else str(k))
+
+
+def external_group_sum(rows, key_field, sum_field, max_groups=100_000, spill_dir=None):
+    """
+    Exact sum of sum_field per key_field. While there are at most
+    max_groups keys this is a plain dict; past that the partial sums are
+    spilled as a sorted run, and the runs are merged so equal keys meet.
+    Returns the same shape as aggregate_sum_by_key: keys in first-seen
+    order when nothing spilled, otherwise sorted by key (None last).
+    """
+    with SortedRuns(key=group_sort_key, spill_dir=spill_dir) as runs:
+        partial = {}
+        for r in rows:
+            k = r.get(key_field, "UNKNOWN")
+            partial[k] = partial.get(k, 0.0) + safe_float(r.get(sum_field, 0))
+            if len(partial) > max_groups:
+                runs.spill(list(partial.items()))
+                partial = {}
+        if not runs.files:
+            totals = partial.items()
+        else:
+            tail = sorted(partial.items(), key=group_sort_key)
+            totals = []
+            for k, group in groupby(runs.merged(tail=tail), key=lambda kv: kv[0]):
+                totals.append((k, math.fsum(v for _, v in group)))
+        return [{"key": k, sum_field: round(v, 2)} for k, v in totals]
+
+
+def percentile_positions(n, percentiles):
+    """{p: (lower index, upper index, weight)} with linear interpolation."""
+    out = {}
+    for p in percentiles:
+        pos = (n - 1) * p / 100
+        lo = math.floor(pos)
+        out[p] = (lo, min(lo + 1, n - 1), pos - lo)
+    return out
+
+
+def external_stats_summary(values, max_in_memory=1_000_000, percentiles=(), spill_dir=None):
+    """
+    Same result as utils.stats_summary (mean, exact median, variance, min,
+    max, count, plus p<N> for each percentile) over any number of values.
+    The values are externally sorted once; the merged runs are then read
+    three times (order statistics, sum, squared deviations).
+    """
+    with SortedRuns(spill_dir=spill_dir) as runs:
+        buf = []
+        n = 0
+        for v in values:
+            if v is None:
+                continue
+            buf.append(v)
+            n += 1
+            if len(buf) >= max_in_memory:
+                runs.spill(buf)
+                buf = []
+        if n == 0:
+            return {"count": 0}
+        buf.sort()
+
+        positions = percentile_positions(n, [50] + list(percentiles))
+        wanted = {0, n - 1}  # min and max
+        for lo, hi, _ in positions.values():
+            wanted.update((lo, hi))
+        picked = {}
+        for i, v in enumerate(runs.merged(tail=buf)):
+            if i in wanted:
+                picked[i] = v
+        mean = math.fsum(runs.merged(tail=buf)) / n
+        variance = math.fsum((v - mean) ** 2 for v in runs.merged(tail=buf)) / n if n > 1 else 0.0
+
+        def at(p):
+            lo, hi, w = positions[p]
+            return picked[lo] if w == 0 else picked[lo] * (1 - w) + picked[hi] * w
+
+        summary = {
+            "count": n,
+            "mean": mean,
+            "median": at(50),
+            "variance": variance,
+            "min": picked[0],
+            "max": picked[n - 1]
+        }
+        for p in percentiles:
+            summary[f"p{p}"] = at(p)
+        return summary
@@ -0,0 +1,229 @@
+# fast_csv.py
+import csv
+import io
+import mmap
+import re
+from array import array
+from operator import itemgetter
+
+# Alternate CSV backend: tokenizes the raw bytes of a memory-mapped file
+# instead of decoding the whole file through csv.DictReader.
+# Lines without quotes are split by a regex and only the projected columns
+# are decoded; runs of lines with quotes are decoded and split by csv.reader.
+
+QUOTE = b'"'
+NEWLINE = b"\n"
+CHUNK_SIZE = 8 * 1024 * 1024
+RUN_END = "end"  # marker record appended to a quoted run (see read_quoted_run)
+QUOTE_FREE_LINE = re.compile(rb'\n[^"\n]*\n')  # the newline before a line without quotes
+
+
+# -------- Tokenizing --------
+def read_records(segment, encoding):
+    """
+    Records of a run of lines (bytes), decoded and split by csv.reader, so
+    a quote only opens a quoted field at the start of a field, exactly as
+    in DictReader. Blank lines are skipped, as DictReader does.
+    """
+    text = segment.decode(encoding)
+    return list(filter(None, csv.reader(io.StringIO(text, newline=""))))
+
+
+def project(records, idx):
+    """One list of fields per position in idx (None where a record is too short)."""
+    try:
+        return [list(map(itemgetter(i), records)) for i in idx]
+    except IndexError:
+        return [[rec[i] if i < len(rec) else None for rec in records] for i in idx]
+
+
+def line_end(buf, pos):
+    """Offset just past the first newline at or after pos (len(buf) if there is none)."""
+    nl = buf.find(NEWLINE, pos)
+    return len(buf) if nl == -1 else nl + 1
+
+
+def read_quoted_run(buf, start, stop, encoding):
+    """
+    Return (records, stop) for the whole lines buf[start:stop].
+    A marker line is read after the run: it only comes back as a record of
+    its own if the run ended between records. Otherwise stop fell inside a
+    quoted field, so the run is doubled and read again.
+    """
+    end = len(buf)
+    while stop < end:
+        records = read_records(buf[start:stop] + RUN_END.encode() + NEWLINE, encoding)
+        if records[-1] == [RUN_END]:
+            records.pop()
+            return records, stop
+        stop = line_end(buf, stop + (stop - start))
+    # an unterminated quoted field ends with the file, as in csv.reader
+    return read_records(buf[start:end], encoding), end
+
+
+def projection_pattern(idx):
+    """
+    Regex matching the start of an unquoted record and capturing the
+    fields at positions idx; fields past the last one are never touched.
+    """
+    field = rb"[^,\r\n]*"
+    parts = [b"(" + field + b")" if i in idx else field for i in range(max(idx) + 1)]
+    # (?=[^\r\n]): a blank line must not match, or it would count as a record
+    return re.compile(rb"^(?=[^\r\n])" + b",".join(parts), re.M)
+
+
+def tokenize_plain(segment, pattern, idx):
+    """
+    Tokenize a quote-free run of whole lines with one regex findall in C.
+    Returns None if blank or short lines are present.
+    """
+    matches = pattern.findall(segment)
+    expected = segment.count(NEWLINE) + (0 if segment.endswith(NEWLINE) else 1)
+    if len(matches) != expected:
+        return None
+    order = sorted(set(idx))
+    if len(order) == 1:
+        cols = {order[0]: matches}
+    else:
+        cols = dict(zip(order, (list(c) for c in zip(*matches))))
+    return [cols[i] for i in idx]
+
+
+def iter_batches(buf, idx, start=0, encoding="utf-8"):
+    """
+    Yield (columns, plain) pieces of the map: columns holds one list of
+    fields per position in idx. When plain, the fields are raw bytes that
+    cannot contain a newline or be None, so decode_column decodes a column
+    with a single join/decode/split; otherwise they are str as csv.reader
+    returned them (None where a row is too short).
+
+    Runs of lines without quotes (the common case) are tokenized by a
+    regex in C; each run of lines containing quotes is read by one
+    csv.reader call, which also finds where its last record ends.
+    """
+    pattern = projection_pattern(idx)
+    pos = start
+    end = len(buf)
+    while pos < end:
+        stop = min(pos + CHUNK_SIZE, end)
+        if stop < end:
+            nl = buf.rfind(NEWLINE, pos, stop)
+            stop = line_end(buf, stop) if nl == -1 else nl + 1
+
+        q = buf.find(QUOTE, pos, stop)
+        plain_end = stop if q == -1 else max(pos, buf.rfind(NEWLINE, pos, q) + 1)
+        if plain_end > pos:
+            segment = buf[pos:plain_end]
+            cols = tokenize_plain(segment, pattern, idx)
+            if cols is not None:
+                yield cols, True
+            else:
+                # blank or short lines present: split this run the slow way
+                yield project(read_records(segment, encoding), idx), False
+        pos = plain_end
+        if q != -1:
+            # the quoted run goes up to the next line without a quote
+            free = QUOTE_FREE_LINE.search(buf, plain_end, stop)
+            records, pos = read_quoted_run(buf, plain_end, free.start() + 1 if free else stop, encoding)
+            yield project(records, idx), False
+
+
+def open_mmap(path):
+    """Return (file, mmap) for path; an empty file gives an empty bytes buffer."""
+    f = open(path, "rb")
+    try:
+        return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:  # cannot mmap an empty file
+        return f, b""
+
+
+def close_mmap(f, buf):
+    if isinstance(buf, mmap.mmap):
+        buf.close()
+    f.close()
+
+
+def read_header(buf, encoding):
+    """Return (names, offset of the first data record)."""
+    nl = buf.find(NEWLINE)
+    end = len(buf) if nl == -1 else nl + 1
+    header = buf[:end].rstrip(b"\r\n")
+    if not header:
+        return [], end
+    return read_records(header, encoding)[0], end
+
+
+# -------- Decoding --------
+def decode_column(col, plain, encoding):
+    if plain:
+        # one decode call per column; fields of a plain chunk contain no newline
+        return NEWLINE.join(col).decode(encoding).split("\n") if col else []
+    return col  # already decoded by read_records
+
+
+def parse_number(raw):
+    """Parse a numeric field (raw bytes or str); empty or invalid -> NaN."""
+    try:
+        return float(raw)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def parse_numeric_column(col):
+    try:
+        return array("d", map(float, col))
+    except (TypeError, ValueError):
+        return array("d", map(parse_number, col))
+
+
+# -------- Loading --------
+def iter_csv_mmap(path, columns=None, encoding="utf-8"):
+    """
+    Stream rows of a CSV file as dicts, like csv.DictReader.
+    columns: optional list of fields to keep; other fields are never decoded.
+    Short rows get None for the missing fields, as DictReader does; fields
+    past the header are dropped.
+    """
+    f, buf = open_mmap(path)
+    try:
+        names, start = read_header(buf, encoding)
+        keys = names if columns is None else [c for c in columns if c in names]
+        if not keys:
+            return
+        idx = [names.index(k) for k in keys]
+        for cols, plain in iter_batches(buf, idx, start, encoding):
+            decoded = [decode_column(col, plain, encoding) for col in cols]
+            for values in zip(*decoded):
+                yield dict(zip(keys, values))
+    finally:
+        close_mmap(f, buf)
+
+
+def load_csv_mmap(path, columns=None, encoding="utf-8"):
+    return list(iter_csv_mmap(path, columns=columns, encoding=encoding))
+
+
+def load_columns_mmap(path, columns=None, numeric_columns=None, encoding="utf-8"):
+    """
+    Columnar load: returns {column: values}.
+    numeric_columns are parsed from bytes into array('d') (missing -> NaN);
+    the remaining requested columns are decoded to lists of str.
+    """
+    numeric_columns = numeric_columns or []
+    f, buf = open_mmap(path)
+    try:
+        names, start = read_header(buf, encoding)
+        keys = names if columns is None else [c for c in columns if c in names]
+        out = {k: (array("d") if k in numeric_columns else []) for k in keys}
+        if not keys:
+            return out
+        idx = [names.index(k) for k in keys]
+        for cols, plain in iter_batches(buf, idx, start, encoding):
+            for k, col in zip(keys, cols):
+                if k in numeric_columns:
+                    out[k].extend(parse_numeric_column(col))
+                else:
+                    out[k].extend(decode_column(col, plain, encoding))
+        return out
+    finally:
+        close_mmap(f, buf)
@@ -1,9 +1,12 @@
 # main.py
 import os
+from contextlib import ExitStack
+from datetime import datetime
+from itertools import islice
 from pipeline import (
-    load_csv, load_json, handle_missing, standardize_dates, standardize_numbers,
+    iter_csv, load_json, handle_missing, standardize_dates, standardize_numbers,
     filter_rows, compute_sales_growth, aggregate_sum_by_key,
-    analyze_statistics, save_clean_data, save_analysis_summary
+    iter_numeric_column, analyze_statistics
 )
 
 from visualizer import (
@@ -11,68 +14,249 @@ from visualizer import (
     plot_line, plot_bar, plot_hist, plot_scatter
 )
 
-from utils import write_csv, safe_float
+from utils import safe_float
+from nullmask import mask_counts
+from dedup import Deduplicator
+from validation import compile_schema, validate, save_quarantine
+from sinks import open_sinks
+from cache import StageCache, file_digest, run_stages
+from external import Spool, external_stats_summary
 
 PROJECT_ROOT = os.path.dirname(__file__)
 DATA_DIR = os.path.join(PROJECT_ROOT, "..", "Data")
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, "..", "Output", "ImperativeParadigm")
 VISUAL_DIR = os.path.join(OUTPUT_DIR, "Visuals")
 
+def read_memory_budget(value):
+    """PIPELINE_MEMORY_BUDGET as a row count, None when unset; 0 would read no rows at all."""
+    if not value:
+        return None
+    budget = int(value)
+    if budget < 1:
+        raise ValueError(f"PIPELINE_MEMORY_BUDGET must be at least 1, got {value!r}")
+    return budget
+
+
+# "csv" (csv.DictReader) or "mmap" (memory-mapped byte tokenizer)
+CSV_BACKEND = os.environ.get("PIPELINE_CSV_BACKEND", "csv")
+# columns identifying a row; re-sent upstream rows repeat these exactly
+DEDUP_KEYS = ["Date", "Region", "Product"]
+# out-of-core mode (see main_out_of_core): rows are streamed in batches of this size and
+# at most this many groups / values are held in memory before spilling to disk (unset = all in memory)
+MEMORY_BUDGET = read_memory_budget(os.environ.get("PIPELINE_MEMORY_BUDGET"))
+STATS_COLUMNS = ["Sales", "SalesGrowth"]
+STATS_PERCENTILES = [25, 75]
+# rows breaking these rules go to quarantine.csv instead of the pipeline
+SCHEMA = {
+    "Date": {"type": "date", "min_date": "2000-01-01", "max_date": "2100-12-31"},
+    "Region": {"allowed": ["North", "South", "East", "West"]},
+    "Sales": {"type": "float", "non_negative": True},
+    "PreviousSales": {"type": "float", "non_negative": True},
+}
+VALIDATION_CHECKS = compile_schema(SCHEMA)
+# comma-separated output sinks: "csv" (files in OUTPUT_DIR) and/or "sqlite" (OUTPUT_DIR/pipeline.db)
+OUTPUT_SINKS = [name.strip() for name in os.environ.get("PIPELINE_SINKS", "csv").split(",") if name.strip()]
+# rerunning with the same run id replaces that run's rows in the database
+RUN_ID = os.environ.get("PIPELINE_RUN_ID") or datetime.now().strftime("%Y%m%dT%H%M%S")
+SQLITE_WAL = os.environ.get("PIPELINE_SQLITE_WAL", "") == "1"
+FILL_VALUES = {
+    "Date": "UNKNOWN",
+    "Region": "UNKNOWN",
+    "Sales": 0.0,
+    "PreviousSales": 0.0,
+    "Product": "UNKNOWN",
+    "SalesGrowth": 0.0
+}
+DATE_FIELDS = ["Date"]
+NUMERIC_FIELDS = ["Sales", "PreviousSales"]
+PRECISION = 2
+# stage outputs up to standardize_numbers are cached by input + params; PIPELINE_CACHE=0 disables
+CACHE_DIR = os.path.join(OUTPUT_DIR, "cache")
+CACHE_ENABLED = os.environ.get("PIPELINE_CACHE", "1") != "0"
+CACHE_MAX_BYTES = int(os.environ.get("PIPELINE_CACHE_MB", "512")) * 1024 * 1024
+
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(VISUAL_DIR, exist_ok=True)
 
-def main():
-    # 1. Load data (CSV example)
+def load_stage(_):
+    # 1. Load data (CSV example), dropping duplicate rows while streaming
     csv_path = os.path.join(DATA_DIR, "input.csv")
-    rows = load_csv(csv_path)
-    print(f"Loaded {len(rows)} rows")
+    with Deduplicator(key_fields=DEDUP_KEYS) as dedup:
+        rows = list(dedup.iter_unique(iter_csv(csv_path, backend=CSV_BACKEND)))
+    # the load report is part of the stage output, so a cache hit still prints it
+    loaded = len(rows)
 
-    # 2. Handle missing: remove rows missing Sales or Region (example)
-    rows = handle_missing(
-        rows,
-        strategy="fill",
-        fill_values={
-            "Date": "UNKNOWN",
-            "Region": "UNKNOWN",
-            "Sales": 0.0,
-            "PreviousSales": 0.0,
-            "Product": "UNKNOWN",
-            "SalesGrowth": 0.0
-        }
-    )
+    # 1b. Validate: rows breaking the schema are quarantined, not silently coerced
+    input_fields = list(rows[0].keys()) if rows else list(SCHEMA)
+    violation_counts = {}
+    rows, quarantined = validate(rows, VALIDATION_CHECKS, report=violation_counts)
+    return {
+        "loaded": loaded,
+        "dropped": dedup.dropped,
+        "rows": rows,
+        "input_fields": input_fields,
+        "quarantined": quarantined,
+        "violation_counts": violation_counts
+    }
+
+
+def missing_stage(state):
+    # 2. Handle missing: fill every field, recording which values were filled
+    null_masks = {}
+    state["rows"] = handle_missing(state["rows"], strategy="fill", fill_values=FILL_VALUES, null_masks=null_masks)
+    state["null_masks"] = null_masks
+    return state
 
+
+def dates_stage(state):
     # 3. Standardize dates and numbers
-    rows = standardize_dates(rows, date_fields=["Date"])
-    rows = standardize_numbers(rows, numeric_fields=["Sales", "PreviousSales"], precision=2)
+    state["rows"] = standardize_dates(state["rows"], date_fields=DATE_FIELDS)
+    return state
+
 
+def numbers_stage(state):
+    state["rows"] = standardize_numbers(state["rows"], numeric_fields=NUMERIC_FIELDS, precision=PRECISION)
+    return state
+
+
+def transform_rows(rows, null_masks):
     # 4. Filter rows (imperative): keep Sales > 1000
-    rows = filter_rows(rows, lambda r: float(r.get("Sales", 0)) > 1000)
+    rows = filter_rows(rows, lambda r: float(r.get("Sales", 0)) > 1000, null_masks=null_masks)
 
     # 5. Compute new column SalesGrowth
-    rows = compute_sales_growth(rows, current_column="Sales", previous_column="PreviousSales", new_column="SalesGrowth")
+    rows = compute_sales_growth(rows, current_column="Sales", previous_column="PreviousSales", new_column="SalesGrowth", null_masks=null_masks)
+    return rows
+
+
+def input_null_counts(null_masks, input_fields):
+    # FILL_VALUES also fills the derived SalesGrowth, which no input row has yet
+    counts = mask_counts(null_masks)
+    return {f: n for f, n in counts.items() if f in input_fields}
+
+
+def add_counts(total, counts):
+    for k, n in counts.items():
+        total[k] = total.get(k, 0) + n
+
+
+def save_outputs(rows, agg, stats, null_counts, violation_counts, fieldnames=None):
+    # 8. Save results to every configured sink
+    for sink in open_sinks(OUTPUT_SINKS, OUTPUT_DIR, RUN_ID, wal=SQLITE_WAL):
+        with sink:
+            clean_out = sink.write_rows("clean_data", rows, indexes=["Date", "Region"], fieldnames=fieldnames)
+            print(f"Saved cleaned data to {clean_out}")
+            agg_out = sink.write_aggregate("agg_by_region", agg, key_field="key")
+            print(f"Saved aggregation to {agg_out}")
+            summary_out = sink.write_summary(stats, null_counts=null_counts, violation_counts=violation_counts)
+            print(f"Saved analysis summary to {summary_out}")
+
+
+def main_out_of_core(budget):
+    """
+    Same outputs as main() without holding the data in memory: the input is
+    streamed through stages 1-5 in batches of `budget` rows, the clean rows,
+    quarantined rows and stats values are spooled to temp files, and the
+    external group-by / stats read the spools back with at most `budget`
+    groups or values in memory. The stage cache and the charts need every
+    row in memory, so both are skipped.
+    """
+    csv_path = os.path.join(DATA_DIR, "input.csv")
+    input_fields = None
+    clean_fields = None
+    loaded = 0
+    null_counts = {}
+    violation_counts = {}
+    with ExitStack() as stack:
+        dedup = stack.enter_context(Deduplicator(key_fields=DEDUP_KEYS, max_in_memory=budget))
+        clean = stack.enter_context(Spool())
+        quarantined = stack.enter_context(Spool())
+        values = {col: stack.enter_context(Spool()) for col in STATS_COLUMNS}
+
+        unique_rows = dedup.iter_unique(iter_csv(csv_path, backend=CSV_BACKEND))
+        while True:
+            batch = list(islice(unique_rows, budget))
+            if not batch:
+                break
+            loaded += len(batch)
+            if input_fields is None:
+                input_fields = list(batch[0].keys())
+
+            report = {}
+            batch, bad = validate(batch, VALIDATION_CHECKS, report=report)
+            add_counts(violation_counts, report)
+            quarantined.extend(bad)
+
+            state = numbers_stage(dates_stage(missing_stage({"rows": batch})))
+            null_masks = state["null_masks"]
+            add_counts(null_counts, input_null_counts(null_masks, input_fields))
+            rows = transform_rows(state["rows"], null_masks)
+
+            if rows and clean_fields is None:
+                clean_fields = list(rows[0].keys())
+            clean.extend(rows)
+            for col, spool in values.items():
+                spool.extend(iter_numeric_column(rows, col, null_masks.get(col, 0)))
+        print(f"Loaded {loaded} rows ({dedup.dropped} duplicates dropped)")
+
+        quarantine_out = os.path.join(OUTPUT_DIR, "quarantine.csv")
+        save_quarantine(quarantined, quarantine_out, input_fields or list(SCHEMA))
+        print(f"Quarantined {len(quarantined)} rows to {quarantine_out}")
+        print(f"Missing values filled: {null_counts}")
+
+        # 6-7. Aggregate and analyze straight from the spools
+        agg = aggregate_sum_by_key(clean, key_field="Region", sum_field="Sales", max_groups=budget)
+        stats = {}
+        for col, spool in values.items():
+            stats[col] = external_stats_summary(spool, max_in_memory=budget, percentiles=STATS_PERCENTILES)
+
+        save_outputs(clean, agg, stats, null_counts, violation_counts, fieldnames=clean_fields)
+    print("Visualizations skipped in out-of-core mode")
+
+
+def main():
+    if MEMORY_BUDGET is not None:
+        main_out_of_core(MEMORY_BUDGET)
+        return
+
+    # Stages 1-3 only depend on the input file and their params, so a rerun with
+    # the same input resumes after the deepest stage already in the cache.
+    csv_path = os.path.join(DATA_DIR, "input.csv")
+    stages = [
+        ("load", {"backend": CSV_BACKEND, "dedup_keys": DEDUP_KEYS, "schema": SCHEMA}, load_stage),
+        ("handle_missing", {"strategy": "fill", "fill_values": FILL_VALUES}, missing_stage),
+        ("standardize_dates", {"date_fields": DATE_FIELDS}, dates_stage),
+        ("standardize_numbers", {"numeric_fields": NUMERIC_FIELDS, "precision": PRECISION}, numbers_stage),
+    ]
+    cache = StageCache(CACHE_DIR, max_bytes=CACHE_MAX_BYTES) if CACHE_ENABLED else None
+    state, resumed_from = run_stages(cache, file_digest(csv_path), stages)
+    if resumed_from:
+        print(f"Resumed from cached {resumed_from} output")
+    print(f"Loaded {state['loaded']} rows ({state['dropped']} duplicates dropped)")
+    rows = state["rows"]
+    null_masks = state["null_masks"]
+    violation_counts = state["violation_counts"]
+
+    quarantine_out = os.path.join(OUTPUT_DIR, "quarantine.csv")
+    save_quarantine(state["quarantined"], quarantine_out, state["input_fields"])
+    print(f"Quarantined {len(state['quarantined'])} rows to {quarantine_out}")
+
+    null_counts = input_null_counts(null_masks, state["input_fields"])
+    print(f"Missing values filled: {null_counts}")
+
+    rows = transform_rows(rows, null_masks)
 
     # 6. Aggregate: total sales by Region
     agg = aggregate_sum_by_key(rows, key_field="Region", sum_field="Sales")
 
-    # 7. Analyze statistics
-    stats = analyze_statistics(rows, numeric_columns=["Sales", "SalesGrowth"])
-
-    # 8. Save results
-    clean_out = os.path.join(OUTPUT_DIR, "clean_data.csv")
-    save_clean_data(rows, clean_out)
-    print(f"Saved cleaned data to {clean_out}")
-
-    agg_out = os.path.join(OUTPUT_DIR, "agg_by_region.csv")
-    # convert agg to CSV via pipeline utils
-    if agg:
-        from utils import write_csv
-        write_csv(agg_out, fieldnames=list(agg[0].keys()), rows=agg)
-        print(f"Saved aggregation to {agg_out}")
-
-    summary_out = os.path.join(OUTPUT_DIR, "analysis_summary.txt")
-    save_analysis_summary(stats, summary_out)
-    print(f"Saved analysis summary to {summary_out}")
-    
+    # 7. Analyze statistics (filled-in values are left out)
+    stats = analyze_statistics(
+        rows,
+        numeric_columns=STATS_COLUMNS,
+        exclude_masks=null_masks,
+        percentiles=STATS_PERCENTILES
+    )
+
+    save_outputs(rows, agg, stats, null_counts, violation_counts)
 
     # Line chart: Sales over time
     dates = extract_column(rows, "Date")
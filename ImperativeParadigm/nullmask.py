@@ -0,0 +1,66 @@
+# nullmask.py
+import re
+from functools import reduce
+from operator import or_
+
+# Per-column null masks. A mask is a Python int used as a bitset:
+# bit i is set when row i has no value for the column. Combining masks
+# (&, |, ~) and counting nulls (bit_count) then run over whole columns
+# at once instead of field by field.
+
+NULL_VALUES = (None, "")
+ONE = re.compile("1")
+
+
+def mask_from_flags(flags):
+    """Mask from a sequence of booleans, flags[i] -> bit i."""
+    bits = ["1" if f else "0" for f in flags]
+    bits.reverse()  # row 0 -> least significant bit
+    return int("".join(bits), 2) if bits else 0
+
+
+def null_mask(rows, field):
+    return mask_from_flags([r.get(field) in NULL_VALUES for r in rows])
+
+
+def null_masks(rows, fields):
+    """Return {field: mask} for every field."""
+    masks = {}
+    for f in fields:
+        masks[f] = null_mask(rows, f)
+    return masks
+
+
+def any_mask(masks, fields=None):
+    """OR of the masks of fields (all masks if None): rows missing any of them."""
+    if fields is None:
+        fields = masks.keys()
+    return reduce(or_, (masks.get(f, 0) for f in fields), 0)
+
+
+def mask_counts(masks):
+    counts = {}
+    for f, m in masks.items():
+        counts[f] = m.bit_count()
+    return counts
+
+
+def mask_flags(mask, n):
+    """String of n '0'/'1' flags where flags[i] is bit i of mask."""
+    return bin(mask)[:1:-1].ljust(n, "0")[:n]
+
+
+def mask_indices(mask):
+    """Row indices whose bit is set."""
+    return [m.start() for m in ONE.finditer(bin(mask)[:1:-1])]
+
+
+def select_mask(mask, keep):
+    """Mask for the sub-list of rows at indices keep (in order)."""
+    if not mask or not keep:
+        return 0
+    flags = bin(mask)[:1:-1]
+    n = len(flags)
+    selected = [flags[i] if i < n else "0" for i in keep]
+    selected.reverse()
+    return int("".join(selected), 2)
@@ -3,9 +3,21 @@ import csv
 import json
 from collections import defaultdict
 from utils import parse_date, safe_float, write_csv, stats_summary
+from fast_csv import load_csv_mmap, iter_csv_mmap
+import nullmask
+from external import external_group_sum, external_stats_summary
 
 # -------- Loading DataFile CSV --------
-def load_csv(path):
+def load_csv(path, backend="csv", columns=None):
+    """
+    backend: "csv" (csv.DictReader) or "mmap" (fast_csv byte tokenizer)
+    columns: optional list of fields to keep (only used by the mmap backend,
+             which then skips decoding the other fields)
+    """
+    if backend == "mmap":
+        return load_csv_mmap(path, columns=columns)
+    if backend != "csv":
+        raise ValueError(f"Unknown CSV backend: {backend}")
     rows = []
     with open(path, encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -13,6 +25,17 @@ def load_csv(path):
             rows.append(dict(r))
     return rows
 
+def iter_csv(path, backend="csv", columns=None):
+    """Streaming variant of load_csv: yields rows one at a time."""
+    if backend == "mmap":
+        yield from iter_csv_mmap(path, columns=columns)
+        return
+    if backend != "csv":
+        raise ValueError(f"Unknown CSV backend: {backend}")
+    with open(path, encoding="utf-8") as f:
+        for r in csv.DictReader(f):
+            yield dict(r)
+
 def load_json(path):
     with open(path, encoding="utf-8") as f:
         data = json.load(f)
@@ -26,29 +49,38 @@ def load_json(path):
     return data
 
 # -------- Cleaning --------
-def handle_missing(rows, strategy="fill", fill_values=None, required_fields=None):
+def handle_missing(rows, strategy="fill", fill_values=None, required_fields=None, null_masks=None):
     """
     strategy: "fill" or "remove"
     fill_values: dict of {field: default}
     required_fields: list of fields that must be present (if remove and any missing -> remove)
+    null_masks: optional dict, filled with {field: null mask} (see nullmask.py)
+                for the returned rows, so later stages can tell filled values apart
     """
-    out = []
-    for r in rows:
-        row = dict(r)  # mutable copy
-        missing = False
-        if required_fields:
-            for f in required_fields:
-                if row.get(f, "") == "" or row.get(f) is None:
-                    missing = True
-                    break
-        if missing and strategy == "remove":
-            continue
-        # fill defaults
-        if strategy == "fill" and fill_values:
-            for k, v in fill_values.items():
-                if row.get(k, "") == "" or row.get(k) is None:
-                    row[k] = v
-        out.append(row)
+    rows = list(rows)  # may be a generator (iter_csv); the masks read it once per field
+    fields = list(fill_values or {})
+    for f in required_fields or []:
+        if f not in fields:
+            fields.append(f)
+    masks = nullmask.null_masks(rows, fields)
+
+    out = [dict(r) for r in rows]  # mutable copies
+    if strategy == "remove" and required_fields:
+        # one OR over the required columns instead of a check per row
+        drop = nullmask.any_mask(masks, required_fields)
+        if drop:
+            keep = [i for i, flag in enumerate(nullmask.mask_flags(drop, len(out))) if flag == "0"]
+            out = [out[i] for i in keep]
+            for f in masks:
+                masks[f] = nullmask.select_mask(masks[f], keep)
+    # fill defaults, touching only the rows whose bit is set
+    if strategy == "fill" and fill_values:
+        for k, v in fill_values.items():
+            for i in nullmask.mask_indices(masks[k]):
+                out[i][k] = v
+
+    if null_masks is not None:
+        null_masks.update(masks)
     return out
 
 def standardize_dates(rows, date_fields):
@@ -67,15 +99,26 @@ def standardize_numbers(rows, numeric_fields, precision=2):
     return rows
 
 # -------- Transformation --------
-def filter_rows(rows, condition_fn):
-    """condition_fn takes a row and returns True to keep"""
+def filter_rows(rows, condition_fn, null_masks=None):
+    """
+    condition_fn takes a row and returns True to keep
+    null_masks: optional {field: mask} for rows; updated in place to follow the kept rows
+    """
     out = []
-    for r in rows:
+    keep = []
+    for i, r in enumerate(rows):
         if condition_fn(r):
             out.append(r)
+            keep.append(i)
+    if null_masks:
+        for f in null_masks:
+            null_masks[f] = nullmask.select_mask(null_masks[f], keep)
     return out
 
-def compute_sales_growth(rows, current_column="Sales", previous_column="PreviousSales", new_column="SalesGrowth"):
+def compute_sales_growth(rows, current_column="Sales", previous_column="PreviousSales", new_column="SalesGrowth", null_masks=None):
+    """null_masks: optional {field: mask}; new_column is computed for every row, so its mask is cleared"""
+    if null_masks and new_column in null_masks:
+        null_masks[new_column] = 0
     for r in rows:
         cur = safe_float(r.get(current_column, 0))
         prev = safe_float(r.get(previous_column, 0))
@@ -86,7 +129,13 @@ def compute_sales_growth(rows, current_column="Sales", previous_column="Previous
     return rows
 
 # -------- Aggregation --------
-def aggregate_sum_by_key(rows, key_field, sum_field):
+def aggregate_sum_by_key(rows, key_field, sum_field, max_groups=None):
+    """
+    max_groups: out-of-core mode; once more than max_groups keys are held,
+                partial sums spill to disk as sorted runs (see external.py)
+    """
+    if max_groups is not None:
+        return external_group_sum(rows, key_field, sum_field, max_groups=max_groups)
     agg = defaultdict(float)
     for r in rows:
         k = r.get(key_field, "UNKNOWN")
@@ -96,21 +145,36 @@ def aggregate_sum_by_key(rows, key_field, sum_field):
     return [{"key": k, sum_field: round(v, 2)} for k, v in agg.items()]
 
 # -------- Analysis --------
-def numeric_column_list(rows, column):
-    out = []
-    for r in rows:
+def iter_numeric_column(rows, column, skip_mask=0):
+    """Lazy numeric_column_list: yields the values one at a time (e.g. into external_stats_summary)"""
+    flags = nullmask.mask_flags(skip_mask, len(rows)) if skip_mask else None
+    for i, r in enumerate(rows):
+        if flags is not None and flags[i] == "1":
+            continue
         try:
-            v = float(r.get(column))
-            out.append(v)
+            yield float(r.get(column))
         except Exception:
             continue
-    return out
 
-def analyze_statistics(rows, numeric_columns):
+def numeric_column_list(rows, column, skip_mask=0):
+    """skip_mask: rows whose bit is set are left out (e.g. values filled by handle_missing)"""
+    return list(iter_numeric_column(rows, column, skip_mask))
+
+def analyze_statistics(rows, numeric_columns, exclude_masks=None, percentiles=(), max_in_memory=None):
+    """
+    exclude_masks: optional {column: null mask}; masked rows are excluded from that column's stats
+    percentiles: extra p<N> entries per column (e.g. [25, 75])
+    max_in_memory: out-of-core mode; values are externally sorted in runs of this size
+    """
+    exclude_masks = exclude_masks or {}
     result = {}
     for col in numeric_columns:
-        vals = numeric_column_list(rows, col)
-        result[col] = stats_summary(vals)
+        if max_in_memory is not None:
+            vals = iter_numeric_column(rows, col, exclude_masks.get(col, 0))
+            result[col] = external_stats_summary(vals, max_in_memory=max_in_memory, percentiles=percentiles)
+        else:
+            vals = numeric_column_list(rows, col, exclude_masks.get(col, 0))
+            result[col] = stats_summary(vals, percentiles=percentiles)
     return result
 
 # -------- Output Helpers --------
@@ -120,12 +184,22 @@ def save_clean_data(rows, output_path):
     fieldnames = list(rows[0].keys())
     write_csv(output_path, fieldnames, rows)
 
-def save_analysis_summary(summary_dict, output_path):
+def save_analysis_summary(summary_dict, output_path, null_counts=None, violation_counts=None):
     lines = []
     for col, s in summary_dict.items():
         lines.append(f"Column: {col}")
         for k, v in s.items():
             lines.append(f"  {k}: {v}")
         lines.append("")
+    if null_counts:
+        lines.append("Missing values")
+        for col, n in null_counts.items():
+            lines.append(f"  {col}: {n}")
+        lines.append("")
+    if violation_counts:
+        lines.append("Validation")
+        for rule, n in violation_counts.items():
+            lines.append(f"  {rule}: {n}")
+        lines.append("")
     with open(output_path, "w", encoding="utf-8") as f:
         f.write("\n".join(lines))
@@ -0,0 +1,282 @@
+# sinks.py
+import os
+import sqlite3
+from itertools import islice
+from operator import itemgetter
+from utils import write_csv
+from nullmask import NULL_VALUES
+from pipeline import save_analysis_summary
+
+# Output sinks. Every sink takes the same three writes, so main() can send
+# its results to any mix of them:
+#   write_rows(name, rows, indexes=())        -- clean / quarantined rows
+#   write_aggregate(name, rows, key_field)   -- one row per group key
+#   write_summary(stats, null_counts, violation_counts)
+#
+# CsvSink keeps the original files in Output/<Paradigm>/. SqliteSink loads
+# the same data into typed tables for BI tools. Every table has a run_id
+# column; rerunning with the same run_id replaces that run's rows in every
+# table (aggregates and stats are keyed on (run_id, key)).
+
+BATCH_SIZE = 50_000  # rows per executemany call; a whole table load is one transaction
+
+
+def quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def is_real(value):
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def infer_types(rows, fieldnames):
+    """{field: "REAL" | "TEXT"}; REAL when every non-empty value in rows is numeric."""
+    types = {}
+    for f in fieldnames:
+        distinct = set(r.get(f) for r in rows)
+        distinct.difference_update(NULL_VALUES)
+        types[f] = "REAL" if distinct and all(is_real(v) for v in distinct) else "TEXT"
+    return types
+
+
+def sql_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def iter_values(rows, fields):
+    """Parameter tuples for rows in fields order (None for missing keys)."""
+    if len(fields) > 1:
+        getter = itemgetter(*fields)
+    else:
+        getter = lambda r, f=fields[0]: (r[f],)  # itemgetter of one field returns a bare value
+    for r in rows:
+        try:
+            yield getter(r)
+        except KeyError:
+            yield tuple(map(r.get, fields))
+
+
+def insert_sql(table, run_id, fields, conflict=None):
+    """
+    INSERT for (run_id, *fields) taking only fields as parameters.
+    run_id is inlined as a literal so rows need no per-row tuple concatenation;
+    NULLIF turns empty CSV fields into NULL and REAL column affinity converts
+    numeric strings, both inside SQLite.
+    """
+    columns = ", ".join(quote(c) for c in ["run_id"] + list(fields))
+    params = ", ".join(["NULLIF(?, '')"] * len(fields))
+    sql = f"INSERT INTO {quote(table)} ({columns}) VALUES ({sql_literal(run_id)}, {params})"
+    if conflict is not None:
+        key, updates = conflict
+        action = "DO UPDATE SET " + ", ".join(f"{quote(c)} = excluded.{quote(c)}" for c in updates) \
+            if updates else "DO NOTHING"
+        sql += f" ON CONFLICT ({', '.join(quote(c) for c in ['run_id'] + list(key))}) {action}"
+    return sql
+
+
+class CsvSink:
+    """Writes <name>.csv files and analysis_summary.txt to output_dir."""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+
+    def write_rows(self, name, rows, indexes=(), fieldnames=None):
+        path = os.path.join(self.output_dir, f"{name}.csv")
+        if fieldnames is None:
+            if not rows:
+                return path  # like save_clean_data: nothing to write
+            fieldnames = list(rows[0].keys())
+        write_csv(path, fieldnames, rows)
+        return path
+
+    def write_aggregate(self, name, rows, key_field="key"):
+        return self.write_rows(name, rows)
+
+    def write_summary(self, stats, null_counts=None, violation_counts=None):
+        path = os.path.join(self.output_dir, "analysis_summary.txt")
+        save_analysis_summary(stats, path, null_counts=null_counts, violation_counts=violation_counts)
+        return path
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SqliteSink:
+    """
+    Bulk loader into a SQLite database.
+    Rows are inserted with executemany in batches of batch_size inside one
+    transaction per table; indexes are dropped before the load and built
+    after it. wal=True switches the database to WAL mode with
+    synchronous=NORMAL, so readers are not blocked while a run loads.
+    """
+
+    def __init__(self, path, run_id, wal=False, batch_size=BATCH_SIZE):
+        self.path = path
+        self.run_id = str(run_id)
+        self.batch_size = batch_size
+        # autocommit mode: transactions are opened explicitly around each load
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        if wal:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    # -------- Schema --------
+    def table_columns(self, table):
+        return [c[1] for c in self.conn.execute(f"PRAGMA table_info({quote(table)})")]
+
+    def ensure_table(self, table, types, primary_key=None):
+        """Create table (run_id + typed columns), adding columns a previous run did not have."""
+        existing = self.table_columns(table)
+        if not existing:
+            cols = ["run_id TEXT NOT NULL"] + [f"{quote(c)} {t}" for c, t in types.items()]
+            if primary_key:
+                cols.append(f"PRIMARY KEY ({', '.join(quote(c) for c in primary_key)})")
+            self.conn.execute(f"CREATE TABLE {quote(table)} ({', '.join(cols)})")
+            return
+        for c, t in types.items():
+            if c not in existing:
+                self.conn.execute(f"ALTER TABLE {quote(table)} ADD COLUMN {quote(c)} {t}")
+
+    def clear_run(self, table):
+        """Delete this run's rows from table (if it exists)."""
+        if self.table_columns(table):
+            self.conn.execute(f"DELETE FROM {quote(table)} WHERE run_id = ?", (self.run_id,))
+
+    def begin(self):
+        self.conn.execute("BEGIN")
+
+    def commit(self):
+        self.conn.execute("COMMIT")
+
+    def rollback(self):
+        if self.conn.in_transaction:
+            self.conn.execute("ROLLBACK")
+
+    def insert_batches(self, sql, values):
+        it = iter(values)
+        while True:
+            batch = list(islice(it, self.batch_size))
+            if not batch:
+                break
+            self.conn.executemany(sql, batch)
+
+    # -------- Writes --------
+    def write_rows(self, name, rows, indexes=(), fieldnames=None):
+        """
+        Replace this run's rows in table name.
+        indexes: columns to index (plus run_id), built once the rows are in.
+        Column types are inferred from the first batch_size rows.
+        """
+        rows = iter(rows)
+        head = list(islice(rows, self.batch_size))
+        if fieldnames is None:
+            fieldnames = list(head[0].keys()) if head else []
+        if not fieldnames:
+            # nothing to load, but a rerun must not keep the run's old rows
+            self.clear_run(name)
+            return self.path
+        fields = list(fieldnames)
+        index_names = [f"{name}_run_id"] + [f"{name}_{c}" for c in indexes]
+        index_cols = [["run_id"]] + [[c] for c in indexes]
+
+        self.begin()
+        try:
+            self.ensure_table(name, infer_types(head, fields))
+            self.clear_run(name)
+            for idx in index_names:
+                self.conn.execute(f"DROP INDEX IF EXISTS {quote(idx)}")
+
+            sql = insert_sql(name, self.run_id, fields)
+            for chunk in (head, rows):
+                self.insert_batches(sql, iter_values(chunk, fields))
+
+            for idx, cols in zip(index_names, index_cols):
+                self.conn.execute(
+                    f"CREATE INDEX {quote(idx)} ON {quote(name)} ({', '.join(quote(c) for c in cols)})"
+                )
+            self.commit()
+        except BaseException:
+            self.rollback()
+            raise
+        return self.path
+
+    def upsert(self, table, types, key, rows):
+        """
+        Replace this run's rows in table with rows (tuples without run_id).
+        (run_id, *key) is the primary key; a key repeated in rows keeps its last values.
+        """
+        updates = [c for c in types if c not in key]
+        sql = insert_sql(table, self.run_id, list(types), conflict=(key, updates))
+        self.begin()
+        try:
+            self.ensure_table(table, types, primary_key=["run_id"] + list(key))
+            # keys missing from this write must not survive from an earlier one
+            self.clear_run(table)
+            self.insert_batches(sql, rows)
+            self.commit()
+        except BaseException:
+            self.rollback()
+            raise
+
+    def write_aggregate(self, name, rows, key_field="key"):
+        if not rows:
+            self.clear_run(name)
+            return self.path
+        fields = list(rows[0].keys())
+        types = infer_types(rows, fields)
+        types[key_field] = "TEXT"
+        self.upsert(name, types, [key_field], iter_values(rows, fields))
+        return self.path
+
+    def write_summary(self, stats, null_counts=None, violation_counts=None):
+        """stats -> table stats(run_id, column, stat, value); counts -> quality(run_id, kind, name, count)."""
+        stat_rows = []
+        for col, s in stats.items():
+            for k, v in s.items():
+                stat_rows.append((col, k, v))
+        self.upsert("stats", {"column": "TEXT", "stat": "TEXT", "value": "REAL"},
+                    ["column", "stat"], stat_rows)
+
+        count_rows = []
+        for kind, counts in (("missing", null_counts), ("violation", violation_counts)):
+            for name, n in (counts or {}).items():
+                count_rows.append((kind, name, n))
+        self.upsert("quality", {"kind": "TEXT", "name": "TEXT", "count": "INTEGER"},
+                    ["kind", "name"], count_rows)
+        return self.path
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_sinks(names, output_dir, run_id, wal=False):
+    """Build sinks from names ("csv", "sqlite"); raises ValueError on unknown names."""
+    # check every name before opening anything, so a bad name leaks no connection
+    for name in names:
+        if name not in ("csv", "sqlite"):
+            raise ValueError(f"Unknown output sink: {name!r} (expected 'csv' or 'sqlite')")
+    sinks = []
+    for name in names:
+        if name == "csv":
+            sinks.append(CsvSink(output_dir))
+        else:
+            sinks.append(SqliteSink(os.path.join(output_dir, "pipeline.db"), run_id, wal=wal))
+    return sinks
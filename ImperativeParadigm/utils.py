@@ -1,6 +1,7 @@
 # utils.py
 from datetime import datetime
 import csv
+import math
 import statistics
 
 def parse_date(date_str):
@@ -29,8 +30,17 @@ def safe_float(value, default=0.0):
     except Exception:
         return default
 
-def stats_summary(values):
-    """Return dict with mean, median, variance, min, max, count. Uses statistics module."""
+def percentile(sorted_values, p):
+    """p-th percentile (0-100) of a sorted list, linear interpolation between ranks."""
+    pos = (len(sorted_values) - 1) * p / 100
+    lo = math.floor(pos)
+    w = pos - lo
+    if w == 0:
+        return sorted_values[lo]
+    return sorted_values[lo] * (1 - w) + sorted_values[lo + 1] * w
+
+def stats_summary(values, percentiles=()):
+    """Return dict with mean, median, variance, min, max, count (+ p<N> per percentile). Uses statistics module."""
     clean = [v for v in values if v is not None]
     if not clean:
         return {"count": 0}
@@ -42,4 +52,8 @@ def stats_summary(values):
         "min": min(clean),
         "max": max(clean)
     }
+    if percentiles:
+        ordered = sorted(clean)
+        for p in percentiles:
+            summary[f"p{p}"] = percentile(ordered, p)
     return summary
@@ -0,0 +1,220 @@
+# validation.py
+import math
+from datetime import date, datetime
+from itertools import compress, repeat
+from operator import gt, is_not, lt
+from nullmask import NULL_VALUES, mask_from_flags, mask_flags
+from utils import parse_date, write_csv
+
+# Schema validation compiled into per-column checks.
+#
+# A schema maps a column to its constraints, e.g.
+#   {"Sales": {"type": "float", "min": 0},
+#    "Region": {"allowed": ["North", "South"]},
+#    "Date": {"type": "date", "min_date": "2020-01-01"}}
+#
+# compile_schema turns it into one check per column. A check parses each
+# *distinct* value of the column once (as a float, a date, or both), runs
+# every rule over the parsed values, and only then maps the failing values
+# back to rows as a bitmask (see nullmask.py), so a clean column costs one
+# set() plus one parse per distinct value. Empty values pass every rule;
+# missing data is handle_missing's job.
+
+VIOLATIONS_FIELD = "violations"
+
+
+# -------- Parsers (value -> parsed value, or None) --------
+def to_float(value):
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return None
+    return v if math.isfinite(v) else None
+
+
+def ascii_digits(s):
+    return s.isascii() and s.isdigit()
+
+
+def iso_date(value):
+    """ISO date for value, or None if no known format matches."""
+    value = str(value)
+    # fast paths for parse_date's first two formats (%Y-%m-%d, then %d/%m/%Y);
+    # years before 1000 are left to parse_date, which doesn't zero-pad them
+    if (len(value) == 10 and value[0] != "0" and value[4] == "-" and value[7] == "-"
+            and ascii_digits(value[:4] + value[5:7] + value[8:])):
+        try:
+            date.fromisoformat(value)
+        except ValueError:
+            return None
+        return value
+    if len(value) == 10 and value[2] == "/" and value[5] == "/" and value[6] != "0":
+        day, month, year = value[:2], value[3:5], value[6:]
+        if ascii_digits(day + month + year):
+            try:
+                return date(int(year), int(month), int(day)).isoformat()
+            except ValueError:
+                pass  # e.g. month 13: parse_date still tries %m/%d/%Y
+    # parse_date hands unparseable strings back unchanged, so re-check its result
+    # unless it was rewritten (a successful parse always comes back as YYYY-MM-DD)
+    parsed = parse_date(value)
+    if parsed != value and len(parsed) == 10:
+        return parsed
+    try:
+        datetime.strptime(parsed, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+    return parsed
+
+
+def parse_floats(values):
+    """to_float over a column: a single float() pass when every value is a finite number."""
+    try:
+        parsed = list(map(float, values))
+    except (TypeError, ValueError):
+        return list(map(to_float, values))
+    if all(map(math.isfinite, parsed)):
+        return parsed
+    return list(map(to_float, values))
+
+
+def parse_dates(values):
+    return list(map(iso_date, values))
+
+
+# column parsers: values -> parsed values (None where a value doesn't parse)
+PARSERS = {"float": parse_floats, "date": parse_dates}
+
+
+class ParsedColumn:
+    """The distinct non-empty values of a column after one parser ran over them."""
+
+    def __init__(self, distinct, parse_column=None):
+        if parse_column is None:
+            self.raw = self.values = distinct
+            self.untyped = set()
+            return
+        parsed = parse_column(distinct)
+        typed = list(map(is_not, parsed, repeat(None)))
+        self.raw = list(compress(distinct, typed))  # values that parsed...
+        self.values = list(compress(parsed, typed))  # ...and what they parsed to
+        self.untyped = set(distinct).difference(self.raw)
+
+
+# A rule is (name, parser, failing): parser is a PARSERS key (None: the raw
+# value) and failing(parsed_column) returns the raw values breaking the rule.
+# The rule bodies are map/compress/set operations over the whole column, so
+# no Python code runs per value.
+def type_rule(column):
+    return column.untyped
+
+
+def bound_rule(fails, bound):
+    """Values x with fails(x, bound), e.g. fails=operator.lt for a lower bound."""
+    def failing(column):
+        return set(compress(column.raw, map(fails, column.values, repeat(bound))))
+    return failing
+
+
+def allowed_rule(allowed):
+    allowed = frozenset(allowed)
+
+    def failing(column):
+        return set(column.raw).difference(allowed)
+    return failing
+
+
+def build_rules(column, spec):
+    """Return [(rule_name, parser, failing)] for one column spec."""
+    rules = []
+    kind = spec.get("type")
+    if kind in PARSERS:
+        rules.append((f"{column}.type", kind, type_rule))
+
+    # bound rules only judge values of the right type; bad types fail ".type" alone
+    if "min" in spec:
+        rules.append((f"{column}.min", "float", bound_rule(lt, spec["min"])))
+    if "max" in spec:
+        rules.append((f"{column}.max", "float", bound_rule(gt, spec["max"])))
+    if spec.get("non_negative"):
+        rules.append((f"{column}.non_negative", "float", bound_rule(lt, 0)))
+    if "allowed" in spec:
+        rules.append((f"{column}.allowed", None, allowed_rule(spec["allowed"])))
+    if "min_date" in spec:
+        rules.append((f"{column}.min_date", "date", bound_rule(lt, spec["min_date"])))
+    if "max_date" in spec:
+        rules.append((f"{column}.max_date", "date", bound_rule(gt, spec["max_date"])))
+    return rules
+
+
+# -------- Compilation --------
+def compile_column_check(rules):
+    """
+    Build check(values) -> {rule_name: failing-row mask} for one column.
+    Each distinct non-empty value is parsed once per parser the rules
+    use, and every rule then runs on the parsed column.
+    """
+    def check(values):
+        distinct = set(values)
+        distinct.difference_update(NULL_VALUES)
+        distinct = list(distinct)
+        columns = {}
+        for _, parser, _ in rules:
+            if parser not in columns:
+                columns[parser] = ParsedColumn(distinct, PARSERS.get(parser))
+
+        masks = {}
+        for name, parser, failing in rules:
+            bad = failing(columns[parser])
+            masks[name] = mask_from_flags(list(map(bad.__contains__, values))) if bad else 0
+        return masks
+    return check
+
+
+def compile_schema(schema):
+    """Return [(column, check)] to pass to validate()."""
+    compiled = []
+    for column, spec in schema.items():
+        rules = build_rules(column, spec)
+        if rules:
+            compiled.append((column, compile_column_check(rules)))
+    return compiled
+
+
+# -------- Validation stage --------
+def validate(rows, compiled, report=None):
+    """
+    Split rows into (valid, quarantined) using a compiled schema.
+    Quarantined rows are copies with an extra "violations" field listing
+    the failed rules. report: optional dict, filled with {rule_name: count}.
+    """
+    rule_masks = {}
+    for column, check in compiled:
+        rule_masks.update(check([r.get(column) for r in rows]))
+
+    failed = 0
+    for m in rule_masks.values():
+        failed |= m
+    if report is not None:
+        for name, m in rule_masks.items():
+            report[name] = m.bit_count()
+    if not failed:
+        return rows, []
+
+    flags = mask_flags(failed, len(rows))
+    rule_flags = [(name, mask_flags(m, len(rows))) for name, m in rule_masks.items() if m]
+    valid = []
+    quarantined = []
+    for i, r in enumerate(rows):
+        if flags[i] == "0":
+            valid.append(r)
+            continue
+        bad = dict(r)
+        bad[VIOLATIONS_FIELD] = ";".join(name for name, f in rule_flags if f[i] == "1")
+        quarantined.append(bad)
+    return valid, quarantined
+
+
+def save_quarantine(rows, output_path, fieldnames):
+    """Always written (header only when nothing failed) so no stale file is left behind."""
+    write_csv(output_path, list(fieldnames) + [VIOLATIONS_FIELD], rows)
@@ -0,0 +1,171 @@
+# Usage: python benchmark.py [size_mb]   (default 1024 -> ~1GB input)
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from pipeline import (
+    load_csv, handle_missing_masked, standardize_dates, standardize_numbers,
+    filter_rows_masked, compute_sales_growth, aggregate_sum_by_key, analyze_statistics
+)
+from utils import safe_float
+from dedup import drop_duplicates
+from fast_csv import load_columns_mmap
+from validation import compile_schema, validate
+from sinks import csv_sink, sqlite_sink
+from cache import file_digest, run_stages
+
+SCHEMA = {
+    "Date": {"type": "date", "min_date": "2000-01-01", "max_date": "2100-12-31"},
+    "Region": {"allowed": ["North", "South", "East", "West", "West, Coast"]},
+    "Sales": {"type": "float", "non_negative": True},
+    "PreviousSales": {"type": "float", "non_negative": True},
+}
+
+HEADER = "Date,Region,Sales,PreviousSales,Product\n"
+SAMPLE_ROWS = (
+    "2025-01-01,North,1500,1200,WidgetA\n",
+    "01/02/2025,South,950,1000,WidgetB\n",
+    "2025-03-05,East,2000,1800,WidgetC\n",
+    "05-03-2025,North,3000,2500,WidgetA\n",
+) * 50 + ('2025-03-07,"West, Coast",,1100,"Widget ""D"""\n',)
+REGIONS = ("North", "South", "East", "West")
+DISTINCT_ROWS = 300_000
+# the in-memory stages use recursive_map (bounded by the recursion limit, quadratic in the
+# list length), so the pipeline runs over batches of PIPELINE_BATCH rows as main_out_of_core does
+PIPELINE_ROWS = 30_000
+PIPELINE_BATCH = 1000
+FILL_VALUES = {"Date": "UNKNOWN", "Region": "UNKNOWN", "Sales": 0.0, "PreviousSales": 0.0,
+               "Product": "UNKNOWN", "SalesGrowth": 0.0}
+REPEAT = 5  # rounds for the validation overhead; the best of each side is kept
+
+
+def make_input(path, size_mb):
+    block = "".join(SAMPLE_ROWS) * 100
+    repeats = (size_mb * 1024 * 1024) // len(block) + 1
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(HEADER)
+        f.writelines(block for _ in range(repeats))
+
+
+def distinct_row(i):
+    day = date(2000, 1, 1) + timedelta(days=i % 36500)
+    text = day.isoformat() if i % 2 else day.strftime("%d/%m/%Y")
+    return f"{text},{REGIONS[i % 4]},{i * 0.37:.2f},{i * 0.29:.2f},Widget{i % 97}\n"
+
+
+def make_distinct_input(path, n_rows):
+    # worst case for the distinct-value checks: every row has its own Sales and
+    # PreviousSales, and Date cycles through ~73k strings (ISO and DD/MM/YYYY)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(HEADER)
+        f.writelines(map(distinct_row, range(n_rows)))
+
+
+def make_quoted_input(path, source):
+    # every field quoted, as spreadsheet and database exports write it
+    with open(source, encoding="utf-8", newline="") as src, open(path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f, quoting=csv.QUOTE_ALL).writerows(csv.reader(src))
+
+
+def write_with(sink, rows):
+    try:
+        sink.write_rows("clean_data", rows, indexes=["Date", "Region"])
+    finally:
+        sink.close()
+
+
+def timed(label, fn):
+    # [Concept: Higher-Order Function] - fn is the loader being measured
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<40} {time.perf_counter() - start:8.2f}s")
+    return result
+
+
+def best_of(fns, repeat=REPEAT):
+    # fns take turns within a round, so other load on the machine slows them alike
+    def run_once(fn):
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+    return [min(times) for times in zip(*(list(map(run_once, fns)) for _ in range(repeat)))]
+
+
+def run_pipeline(path, checks=None):
+    # the steps of main_out_of_core without the outputs; checks=None skips validation
+    rows, _ = drop_duplicates(load_csv(path), ["Date", "Region", "Product"])
+
+    def run_batch(batch):
+        valid = validate(batch, checks)[0] if checks is not None else batch
+        filled, null_masks = handle_missing_masked(valid, fill_values=FILL_VALUES)
+        standard = standardize_numbers(standardize_dates(filled, ["Date"]), ["Sales", "PreviousSales"], precision=2)
+        kept, null_masks = filter_rows_masked(standard, lambda r: safe_float(r.get("Sales", 0)) > 1000, null_masks)
+        grown = compute_sales_growth(kept)
+        return (aggregate_sum_by_key(grown, "Region", "Sales"),
+                analyze_statistics(grown, ["Sales", "SalesGrowth"], exclude_masks=null_masks, percentiles=[25, 75]))
+
+    return list(map(run_batch, (rows[i:i + PIPELINE_BATCH] for i in range(0, len(rows), PIPELINE_BATCH))))
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "input.csv")
+        make_input(path, size_mb)
+        print(f"Input: {os.path.getsize(path) / 1024 / 1024:.0f} MB")
+
+        n = len(timed("csv.DictReader (all columns)", lambda: load_csv(path)))
+        rows = timed("mmap (all columns)", lambda: load_csv(path, backend="mmap"))
+        assert len(rows) == n
+        checks = compile_schema(SCHEMA)
+        timed("validate (compiled schema)", lambda: validate(rows, checks))
+
+        distinct_path = os.path.join(tmp, "distinct.csv")
+        make_distinct_input(distinct_path, DISTINCT_ROWS)
+        distinct_rows = timed(f"csv.DictReader ({DISTINCT_ROWS} distinct rows)", lambda: load_csv(distinct_path))
+        timed("validate (high-cardinality Sales, Date)", lambda: validate(distinct_rows, checks))
+        del distinct_rows
+
+        # every distinct row passes the schema, so validation removes no work downstream
+        pipeline_path = os.path.join(tmp, "pipeline.csv")
+        make_distinct_input(pipeline_path, PIPELINE_ROWS)
+        plain, checked = best_of([lambda: run_pipeline(pipeline_path), lambda: run_pipeline(pipeline_path, checks)])
+        print(f"{f'pipeline ({PIPELINE_ROWS} rows, no validate)':<40} {plain:8.2f}s")
+        print(f"{f'pipeline ({PIPELINE_ROWS} rows, validate)':<40} {checked:8.2f}s")
+        print(f"{'validate overhead':<40} {(checked / plain - 1) * 100:7.1f}%")
+
+        quoted_path = os.path.join(tmp, "quoted.csv")
+        make_quoted_input(quoted_path, distinct_path)
+        n_quoted = len(timed(f"csv.DictReader ({DISTINCT_ROWS} quoted rows)", lambda: load_csv(quoted_path)))
+        assert len(timed(f"mmap ({DISTINCT_ROWS} quoted rows)",
+                         lambda: load_csv(quoted_path, backend="mmap"))) == n_quoted
+        timed("sink: csv", lambda: write_with(csv_sink(tmp), rows))
+        timed("sink: sqlite", lambda: write_with(sqlite_sink(os.path.join(tmp, "rollback.db"), "bench"), rows))
+        timed("sink: sqlite (WAL)",
+              lambda: write_with(sqlite_sink(os.path.join(tmp, "wal.db"), "bench", wal=True), rows))
+        del rows
+        timed("mmap (Region, Sales)", lambda: load_csv(path, backend="mmap", columns=["Region", "Sales"]))
+        timed("mmap columnar (Sales as floats)",
+              lambda: load_columns_mmap(path, columns=["Region", "Sales"], numeric_columns=["Sales"]))
+
+        # standardize_* use recursive_map (bounded by the recursion limit), so only
+        # the load and handle_missing stages are cached here
+        fill_values = {"Sales": 0.0, "PreviousSales": 0.0}
+        stages = [
+            ("load", None, lambda _: load_csv(path, backend="mmap")),
+            ("handle_missing", {"fill_values": fill_values},
+             lambda rows: handle_missing_masked(rows, fill_values=fill_values)),
+        ]
+        cache_dir = os.path.join(tmp, "cache")
+        input_key = timed("input digest", lambda: file_digest(path))
+        timed("stages 1-2 (no cache)", lambda: run_stages(None, input_key, stages))
+        timed("stages 1-2 (cold cache)", lambda: run_stages(cache_dir, input_key, stages, max_bytes=1 << 40))
+        timed("stages 1-2 (warm cache)", lambda: run_stages(cache_dir, input_key, stages, max_bytes=1 << 40))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import zlib
+from functools import reduce
+from itertools import accumulate
+from utils import for_each
+
+# ==========================================
+#  Content-addressed Stage Cache
+# ==========================================
+# مفتاح كل مرحلة = hash(مفتاح المرحلة السابقة, اسم المرحلة, params)، والسلسلة تبدأ
+# من digest لمحتوى ملف الإدخال. فالمفتاح يحدد البيانات والمعاملات التي أنتجت النتيجة بالضبط:
+# تغيير fill_values يغير مفتاح handle_missing وكل ما بعده، والمراحل قبله تحتفظ بمفاتيحها.
+# run_stages تبحث عن أعمق مرحلة موجودة في الـ cache وتشغل ما بعدها فقط.
+#
+# كل مدخل ملف واحد (pickle + zlib). القراءة تحدث mtime، والكتابة تحذف الأقدم استخداماً
+# حتى يصبح الحجم الكلي <= max_bytes (LRU).
+
+CACHE_VERSION = 2  # يُزاد عند تغيير ما تعيده إحدى المراحل
+READ_CHUNK = 8 * 1024 * 1024
+COMPRESS_LEVEL = 1  # سريع؛ مخرجات المراحل معظمها قيم متكررة
+SUFFIX = ".pkl.z"
+MISSING = object()
+
+
+# -------- Keys (Pure) --------
+
+def stage_key(parent_key, stage, params=None):
+    """params يجب أن تكون JSON-serializable (repr كبديل)"""
+    payload = json.dumps([CACHE_VERSION, parent_key, stage, params], sort_keys=True, default=repr)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+
+def chain_keys(input_key, stages):
+    """[Concept: Scan] - مفاتيح المراحل المتسلسلة (accumulate بدلاً من حلقة)"""
+    return list(accumulate(stages, lambda key, stage: stage_key(key, stage[0], stage[1]),
+                           initial=input_key))[1:]
+
+
+def entry_path(cache_dir, key):
+    return os.path.join(cache_dir, key + SUFFIX)
+
+
+def encode(value):
+    return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), COMPRESS_LEVEL)
+
+
+def decode(data):
+    return pickle.loads(zlib.decompress(data))
+
+
+def lru_victims(entries, max_bytes):
+    """
+    entries: [(mtime, size, path)]
+    المسارات التي تُحذف (الأقدم أولاً) حتى يصبح الحجم الكلي <= max_bytes
+    """
+    ordered = sorted(entries)
+    remaining = list(accumulate((size for _, size, _ in ordered), lambda total, size: total - size,
+                                initial=sum(size for _, size, _ in ordered)))
+    return [path for (_, _, path), total in zip(ordered, remaining) if total > max_bytes]
+
+
+# -------- Disk (Impure, isolated) --------
+
+def file_digest(path):
+    """blake2b لمحتوى الملف"""
+    with open(path, "rb") as f:
+        h = reduce(lambda h, chunk: h.update(chunk) or h,
+                   iter(lambda: f.read(READ_CHUNK), b""), hashlib.blake2b(digest_size=20))
+    return h.hexdigest()
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def cache_entries(cache_dir):
+    def stat(name):
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+            return st.st_mtime, st.st_size, path
+        except FileNotFoundError:
+            return None
+
+    return [e for e in map(stat, os.listdir(cache_dir)) if e is not None and e[2].endswith(SUFFIX)]
+
+
+def cache_get(cache_dir, key, default=None):
+    path = entry_path(cache_dir, key)
+    try:
+        with open(path, "rb") as f:
+            value = decode(f.read())
+    except FileNotFoundError:
+        return default
+    except (OSError, zlib.error, pickle.UnpicklingError, EOFError):
+        # مدخل تالف أو ناقص: نحذفه ونعيد الحساب
+        remove_quietly(path)
+        return default
+    os.utime(path)  # استُخدم الآن (LRU)
+    return value
+
+
+def cache_put(cache_dir, key, value, max_bytes):
+    data = encode(value)
+    # نكتب ملفاً مؤقتاً ثم rename، فلا يرى القارئ مدخلاً ناقصاً أبداً
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, entry_path(cache_dir, key))
+    except BaseException:
+        remove_quietly(tmp)
+        raise
+    for_each(remove_quietly, lru_victims(cache_entries(cache_dir), max_bytes))
+
+
+# -------- Public API --------
+
+def run_stages(cache_dir, input_key, stages, max_bytes=512 * 1024 * 1024):
+    """
+    تشغل المراحل بالترتيب بدءاً بعد أعمق مرحلة موجودة في الـ cache.
+    stages: [(name, params, fn)] حيث fn(value) -> value؛ أول fn تستقبل None
+    (وهي التي تحمل الإدخال الذي حُسب منه input_key).
+    cache_dir=None: تشغيل كل المراحل بدون cache.
+    تعيد (value, resumed_from): اسم المرحلة التي استؤنف التشغيل بعدها، أو None.
+    """
+    keys = chain_keys(input_key, stages)
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # [Concept: Lazy Evaluation] - نقرأ من الأعمق للأقل عمقاً ونتوقف عند أول نتيجة
+    hits = ((i, cache_get(cache_dir, keys[i], MISSING)) for i in reversed(range(len(stages))))
+    start, value = next(((i + 1, v) for i, v in hits if v is not MISSING), (0, None)) \
+        if cache_dir is not None else (0, None)
+
+    def step(value, stage_and_key):
+        (_, _, fn), key = stage_and_key
+        result = fn(value)
+        if cache_dir is not None:
+            cache_put(cache_dir, key, result, max_bytes)
+        return result
+
+    result = reduce(step, zip(stages[start:], keys[start:]), value)
+    return result, (stages[start - 1][0] if start else None)
@@ -0,0 +1,143 @@
+import heapq
+import mmap
+import tempfile
+from array import array
+from bisect import bisect_left
+from hashlib import blake2b
+from itertools import compress, islice
+from utils import for_each
+
+# ==========================================
+#  Deduplication (memory-bounded)
+# ==========================================
+# كل صف يتحول إلى بصمة (fingerprint) بطول 64 بت من حقول المفتاح.
+# البصمات الحديثة في set داخل الذاكرة؛ عند تجاوز max_in_memory تكتب إلى
+# القرص كـ run مرتب من uint64، ويتم البحث فيها بـ binary search فوق mmap،
+# مع Bloom filter اختياري أمامها حتى لا تلمس أغلب الصفوف الجديدة القرص.
+# الصفوف التي يكون أحد حقول مفتاحها فارغاً لا يمكن تمييزها، فتبقى دائماً.
+
+SEP = b"\x1f"
+MAX_RUNS = 16  # دمج الـ runs في run واحد بعد هذا العدد
+NULL_VALUES = (None, "")
+
+
+# -------- Pure Helpers --------
+
+def row_fingerprint(row, key_fields):
+    key = SEP.join(str(row.get(f, "")).encode("utf-8") for f in key_fields)
+    return int.from_bytes(blake2b(key, digest_size=8).digest(), "little")
+
+
+def has_key(row, key_fields):
+    return all(row.get(f) not in NULL_VALUES for f in key_fields)
+
+
+def bloom_positions(fp, n_bits, n_hashes=4):
+    # double hashing على نصفي البصمة
+    h1, h2 = fp & 0xFFFFFFFF, (fp >> 32) | 1
+    return [(h1 + i * h2) % n_bits for i in range(n_hashes)]
+
+
+def in_sorted_run(view, fp):
+    i = bisect_left(view, fp)
+    return i < len(view) and view[i] == fp
+
+
+# -------- Spilled Runs (Impure, isolated) --------
+
+def write_run(fingerprints, spill_dir):
+    """كتابة بصمات مرتبة إلى ملف مؤقت وإعادة تعيينه في الذاكرة كـ uint64"""
+    f = tempfile.TemporaryFile(dir=spill_dir)
+    it = iter(fingerprints)
+    # iter(callable, sentinel): دفعات من 65536 بصمة حتى تنتهي (بدون تحميل الـ merge كاملاً)
+    batches = iter(lambda: array("Q", islice(it, 65536)), array("Q"))
+    for_each(lambda batch: batch.tofile(f), batches)
+    f.flush()
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return f, mm, memoryview(mm).cast("Q")
+
+
+def close_run(run):
+    f, mm, view = run
+    view.release()
+    mm.close()
+    f.close()
+
+
+def make_duplicate_checker(key_fields, max_in_memory=1_000_000, bloom_bits=1 << 23, spill_dir=None):
+    """
+    تعيد (is_duplicate, close):
+    is_duplicate(row) -> True إذا ظهر المفتاح من قبل، وإلا تتذكره.
+    [Concept: Closure] - الحالة (set, runs, bloom) محبوسة داخل البيئة ولا تظهر للخارج
+    """
+    state = {"current": set(), "runs": []}
+    bloom = bytearray((bloom_bits + 7) // 8) if bloom_bits else None
+    limit = max(1, max_in_memory)
+
+    def in_bloom(fp):
+        return all(bloom[p >> 3] & (1 << (p & 7)) for p in bloom_positions(fp, bloom_bits))
+
+    def add_to_bloom(fp):
+        for p in bloom_positions(fp, bloom_bits):
+            bloom[p >> 3] |= 1 << (p & 7)
+
+    def spill():
+        run = sorted(state["current"])
+        runs = state["runs"] + [write_run(run, spill_dir)]
+        if bloom is not None:
+            for_each(add_to_bloom, run)
+        if len(runs) > MAX_RUNS:
+            # k-way merge للـ runs المرتبة: البحث يبقى binary search واحد
+            merged = write_run(heapq.merge(*(view for _, _, view in runs)), spill_dir)
+            for_each(close_run, runs)
+            runs = [merged]
+        state.update(current=set(), runs=runs)
+
+    def in_runs(fp):
+        if bloom is not None and not in_bloom(fp):
+            return False
+        return any(in_sorted_run(view, fp) for _, _, view in state["runs"])
+
+    def is_duplicate(row):
+        if not has_key(row, key_fields):
+            return False
+        fp = row_fingerprint(row, key_fields)
+        if fp in state["current"] or (state["runs"] and in_runs(fp)):
+            return True
+        state["current"].add(fp)
+        if len(state["current"]) >= limit:
+            spill()
+        return False
+
+    def close():
+        for_each(close_run, state["runs"])
+        state.update(current=set(), runs=[])
+
+    return is_duplicate, close
+
+
+# -------- Public Stage --------
+
+def mark_duplicates(rows, key_fields, **options):
+    """
+    Streaming path: مولد كسول (Lazy) يعيد أزواج (row, is_duplicate).
+    options: max_in_memory, bloom_bits, spill_dir
+    """
+    is_duplicate, close = make_duplicate_checker(key_fields, **options)
+    try:
+        yield from ((r, is_duplicate(r)) for r in rows)
+    finally:
+        close()
+
+
+def iter_unique(rows, key_fields, **options):
+    return (r for r, dup in mark_duplicates(rows, key_fields, **options) if not dup)
+
+
+def drop_duplicates(rows, key_fields, **options):
+    """
+    List path: تعيد (rows, dropped) - أول ظهور لكل مفتاح يبقى.
+    """
+    rows = list(rows)
+    flags = [not dup for _, dup in mark_duplicates(rows, key_fields, **options)]
+    return list(compress(rows, flags)), flags.count(False)
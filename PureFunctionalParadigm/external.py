@@ -0,0 +1,174 @@
+import heapq
+import math
+import pickle
+import tempfile
+from collections import namedtuple
+from functools import reduce
+from itertools import chain, groupby, islice
+from utils import safe_float, for_each
+
+# ==========================================
+#  Out-of-core Sort & Group-by
+# ==========================================
+# العناصر تُجمع حتى max_in_memory؛ الدفعة الممتلئة تُرتب وتُكتب إلى ملف مؤقت
+# كـ run، ثم تُدمج الـ runs بـ k-way merge (heapq.merge) الذي يحتفظ بعنصر واحد فقط لكل run.
+
+BATCH = 4096  # عدد العناصر في كل سجل pickle داخل ملف الـ run
+
+# append(items) تضيف قائمة إلى نهاية الـ spool، و read() مولد جديد لكل العناصر من البداية
+Spool = namedtuple("Spool", "append read close")
+
+
+# -------- Runs (Impure, isolated) --------
+
+def dump_batches(f, items):
+    for_each(lambda i: pickle.dump(items[i:i + BATCH], f, protocol=pickle.HIGHEST_PROTOCOL),
+             range(0, len(items), BATCH))
+
+
+def write_run(items, key, spill_dir):
+    f = tempfile.TemporaryFile(dir=spill_dir)
+    dump_batches(f, sorted(items, key=key))
+    return f
+
+
+def read_run(f):
+    f.seek(0)
+
+    def load_batch():
+        try:
+            return pickle.load(f)
+        except EOFError:
+            return None
+
+    # iter(callable, sentinel): دفعات حتى نهاية الملف
+    return chain.from_iterable(iter(load_batch, None))
+
+
+def close_runs(files):
+    for_each(lambda f: f.close(), files)
+
+
+def make_spool(spill_dir=None):
+    """
+    ملف مؤقت يُضاف إليه فقط (append-only) لتيار أكبر من الذاكرة.
+    القراءة تبدأ من أول الملف، فيجب أن تنتهي قبل append التالي.
+    [Concept: Closure] - الملف محبوس داخل دوال الـ Spool
+    """
+    f = tempfile.TemporaryFile(dir=spill_dir)
+
+    def append(items):
+        f.seek(0, 2)
+        dump_batches(f, list(items))
+
+    return Spool(append, lambda: read_run(f), f.close)
+
+
+def spill_runs(values, max_in_memory, key=None, spill_dir=None):
+    """
+    تعيد (files, tail, count): الـ runs المكتوبة على القرص، والدفعة الأخيرة مرتبة في الذاكرة، وعدد العناصر.
+    [Concept: Lazy Evaluation] - نقرأ values دفعة دفعة عبر islice
+    """
+    it = iter(values)
+    batches = iter(lambda: list(islice(it, max_in_memory)), [])
+
+    def step(acc, batch):
+        files, tail, count = acc
+        # الدفعة السابقة تكتب إلى القرص، والجديدة تبقى في الذاكرة حتى نعرف إن كانت الأخيرة
+        return (files + [write_run(tail, key, spill_dir)] if tail else files), batch, count + len(batch)
+
+    files, tail, count = reduce(step, batches, ([], [], 0))
+    return files, sorted(tail, key=key), count
+
+
+def merge_runs(files, tail, key=None):
+    """كل الـ runs + tail كتيار واحد مرتب (k-way merge)"""
+    return heapq.merge(*map(read_run, files), iter(tail), key=key)
+
+
+# -------- Public API --------
+
+def external_sort(values, max_in_memory=1_000_000, key=None, spill_dir=None):
+    """مولد يعيد القيم مرتبة مع الاحتفاظ بـ max_in_memory منها فقط في الذاكرة"""
+    files, tail, _ = spill_runs(values, max_in_memory, key, spill_dir)
+    try:
+        yield from merge_runs(files, tail, key)
+    finally:
+        close_runs(files)
+
+
+def group_sort_key(item):
+    # المفتاح قد يكون None للصفوف القصيرة؛ None يأتي بعد كل النصوص
+    k = item[0]
+    return (k is None, "" if k is None else str(k))
+
+
+def external_group_sum(rows, key_field, sum_field, max_groups=100_000, spill_dir=None):
+    """
+    مجموع sum_field لكل key_field بدقة كاملة.
+    المجاميع الجزئية في dict طالما عدد المفاتيح <= max_groups؛ بعد ذلك يُكتب الـ dict كـ run مرتب
+    ويبدأ dict جديد، والدمج يجعل المفاتيح المتساوية متجاورة فنجمعها بـ groupby.
+    النتيجة بنفس شكل aggregate_sum_by_key: بترتيب أول ظهور إذا لم يحدث spill، وإلا مرتبة حسب المفتاح (None أخيراً).
+    """
+    def step(state, r):
+        partial, files = state
+        k = r.get(key_field, "UNKNOWN")
+        # نعدل الـ dict مباشرة لأسباب عملية (نسخه لكل صف مكلف)، كما في aggregate_sum_by_key
+        partial[k] = partial.get(k, 0.0) + safe_float(r.get(sum_field, 0))
+        if len(partial) > max_groups:
+            return {}, files + [write_run(partial.items(), group_sort_key, spill_dir)]
+        return partial, files
+
+    partial, files = reduce(step, rows, ({}, []))
+    try:
+        if not files:
+            totals = partial.items()
+        else:
+            merged = merge_runs(files, sorted(partial.items(), key=group_sort_key), group_sort_key)
+            totals = [(k, math.fsum(v for _, v in group)) for k, group in groupby(merged, key=lambda kv: kv[0])]
+        return [{"key": k, sum_field: round(v, 2)} for k, v in totals]
+    finally:
+        close_runs(files)
+
+
+def percentile_positions(n, percentiles):
+    """{p: (lower index, upper index, weight)} - interpolation خطي بين الرتب"""
+    def position(p):
+        pos = (n - 1) * p / 100
+        lo = math.floor(pos)
+        return lo, min(lo + 1, n - 1), pos - lo
+
+    return {p: position(p) for p in percentiles}
+
+
+def external_stats_summary(values, max_in_memory=1_000_000, percentiles=(), spill_dir=None):
+    """
+    نفس نتيجة utils.stats_summary (مع p<N> لكل percentile) لأي عدد من القيم.
+    القيم تُرتب خارجياً مرة واحدة، ثم يُقرأ التيار المدموج ثلاث مرات
+    (إحصاءات الرتب، المجموع، مربعات الانحراف).
+    """
+    files, tail, n = spill_runs((v for v in values if v is not None), max_in_memory, None, spill_dir)
+    try:
+        if n == 0:
+            return {"count": 0}
+        positions = percentile_positions(n, [50] + list(percentiles))
+        wanted = {0, n - 1} | {i for lo, hi, _ in positions.values() for i in (lo, hi)}
+        picked = {i: v for i, v in enumerate(merge_runs(files, tail)) if i in wanted}
+        mean = math.fsum(merge_runs(files, tail)) / n
+        variance = math.fsum((v - mean) ** 2 for v in merge_runs(files, tail)) / n if n > 1 else 0.0
+
+        def at(p):
+            lo, hi, w = positions[p]
+            return picked[lo] if w == 0 else picked[lo] * (1 - w) + picked[hi] * w
+
+        return {
+            "count": n,
+            "mean": mean,
+            "median": at(50),
+            "variance": variance,
+            "min": picked[0],
+            "max": picked[n - 1],
+            **{f"p{p}": at(p) for p in percentiles}
+        }
+    finally:
+        close_runs(files)
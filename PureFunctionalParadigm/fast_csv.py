@@ -0,0 +1,270 @@
+import csv
+import io
+import mmap
+import re
+from array import array
+from itertools import chain
+from operator import itemgetter
+
+# ==========================================
+#  Memory-mapped CSV backend
+# ==========================================
+# بديل لـ csv.DictReader: نقسم البايتات الخام للملف مباشرة.
+# الأسطر بدون تنصيص يقسمها Regex ولا نفك ترميز إلا الأعمدة المطلوبة منها؛
+# والأسطر المنصصة تُفك وتُقسم بـ csv.reader.
+
+QUOTE = b'"'
+NEWLINE = b"\n"
+CHUNK_SIZE = 8 * 1024 * 1024
+NAN = float("nan")
+RUN_END = "end"  # سجل علامة يُضاف بعد كل run منصص (انظر read_quoted_run)
+QUOTE_FREE_LINE = re.compile(rb'\n[^"\n]*\n')  # the newline before a line without quotes
+
+
+# ==========================================
+#  Unfold (the dual of reduce)
+# ==========================================
+# [Concept: Unfold / Anamorphism]
+# step(state) -> (items, new_state) أو None عند النهاية.
+# هذا هو المكان الوحيد الذي يحتوي على حلقة؛ باقي الدوال Pure.
+# (العودية هنا غير ممكنة لأن عدد الخطوات يتناسب مع حجم الملف)
+
+def unfold(step, state):
+    while True:
+        result = step(state)
+        if result is None:
+            return
+        items, state = result
+        yield from items
+
+
+# -------- Tokenizing (Pure) --------
+
+def read_records(segment, encoding):
+    """
+    سجلات مجموعة أسطر (bytes) بعد فك ترميزها وتقسيمها بـ csv.reader، فعلامة التنصيص
+    تفتح حقلاً منصصاً فقط في بداية الحقل، تماماً كما في DictReader.
+    الأسطر الفارغة يتم تجاهلها كما في DictReader.
+    """
+    return list(filter(None, csv.reader(io.StringIO(segment.decode(encoding), newline=""))))
+
+
+def project(records, idx):
+    """قائمة من الحقول لكل موقع في idx (None للسجلات القصيرة)"""
+    if min(map(len, records), default=0) > max(idx):
+        return [list(map(itemgetter(i), records)) for i in idx]
+    return [[rec[i] if i < len(rec) else None for rec in records] for i in idx]
+
+
+def line_end(buf, pos):
+    """الموضع بعد أول سطر جديد عند pos أو بعده (len(buf) إن لم يوجد)"""
+    nl = buf.find(NEWLINE, pos)
+    return len(buf) if nl == -1 else nl + 1
+
+
+def read_quoted_run(buf, start, stop, encoding):
+    """
+    (records, stop) للأسطر الكاملة buf[start:stop].
+    نقرأ سطر علامة بعد الـ run: يعود كسجل مستقل فقط إذا انتهى الـ run بين سجلين،
+    وإلا فـ stop داخل حقل منصص، فنضاعف الـ run ونقرأه من جديد.
+    [Concept: Recursion] - العمق لوغاريتمي لأن الـ run يتضاعف في كل خطوة
+    """
+    if stop >= len(buf):
+        # حقل منصص بلا نهاية ينتهي مع الملف، كما في csv.reader
+        return read_records(buf[start:], encoding), len(buf)
+    records = read_records(buf[start:stop] + RUN_END.encode() + NEWLINE, encoding)
+    if records[-1] == [RUN_END]:
+        return records[:-1], stop
+    return read_quoted_run(buf, start, line_end(buf, stop + (stop - start)), encoding)
+
+
+def projection_pattern(idx):
+    """
+    Regex يطابق بداية سجل بدون تنصيص ويلتقط الحقول في المواقع idx فقط؛
+    الحقول بعد آخر عمود مطلوب لا يتم لمسها أبداً.
+    """
+    field = rb"[^,\r\n]*"
+    parts = [b"(" + field + b")" if i in idx else field for i in range(max(idx) + 1)]
+    # (?=[^\r\n]): السطر الفارغ لا يطابق، وإلا لحُسب كسجل
+    return re.compile(rb"^(?=[^\r\n])" + b",".join(parts), re.M)
+
+
+def tokenize_plain(segment, pattern, idx):
+    """
+    تقسيم أسطر بدون تنصيص باستدعاء findall واحد (في C).
+    تعيد None إذا وجدت أسطر فارغة أو ناقصة.
+    """
+    matches = pattern.findall(segment)
+    expected = segment.count(NEWLINE) + (0 if segment.endswith(NEWLINE) else 1)
+    if len(matches) != expected:
+        return None
+    order = sorted(set(idx))
+    cols = {order[0]: matches} if len(order) == 1 else dict(zip(order, map(list, zip(*matches))))
+    return [cols[i] for i in idx]
+
+
+def chunk_end(buf, pos):
+    """نهاية الـ chunk التالي (عند سطر جديد)"""
+    stop = min(pos + CHUNK_SIZE, len(buf))
+    if stop == len(buf):
+        return stop
+    nl = buf.rfind(NEWLINE, pos, stop)
+    return line_end(buf, stop) if nl == -1 else nl + 1
+
+
+def iter_batches(buf, idx, start=0, encoding="utf-8"):
+    """
+    مولد (Lazy Sequence) لأزواج (columns, plain):
+    columns قائمة لكل موقع في idx من الحقول.
+    إذا كانت plain فالحقول bytes خام لا تحتوي سطراً جديداً ولا None، فيمكن فك ترميز العمود دفعة واحدة؛
+    وإلا فهي str كما أعادها csv.reader (None للصفوف القصيرة).
+    الأسطر بدون تنصيص (الحالة الشائعة) تمر على Regex، وكل مجموعة متتالية من الأسطر المنصصة
+    تمر على csv.reader باستدعاء واحد.
+    [Concept: Lazy Evaluation] - لا نبني كل السجلات في الذاكرة
+    """
+    pattern = projection_pattern(idx)
+
+    def plain_piece(segment):
+        cols = tokenize_plain(segment, pattern, idx)
+        # أسطر فارغة أو ناقصة: نقسم هذا الجزء بالطريقة البطيئة
+        return (cols, True) if cols is not None else (project(read_records(segment, encoding), idx), False)
+
+    def quoted_piece(run_start, stop):
+        # الـ run المنصص يمتد حتى أول سطر بدون تنصيص
+        free = QUOTE_FREE_LINE.search(buf, run_start, stop)
+        records, run_end = read_quoted_run(buf, run_start, free.start() + 1 if free else stop, encoding)
+        return (project(records, idx), False), run_end
+
+    def step(pos):
+        if pos >= len(buf):
+            return None
+        stop = chunk_end(buf, pos)
+        q = buf.find(QUOTE, pos, stop)
+        plain_end = stop if q == -1 else max(pos, buf.rfind(NEWLINE, pos, q) + 1)
+        before = [plain_piece(buf[pos:plain_end])] if plain_end > pos else []
+        if q == -1:
+            return before, stop
+        piece, run_end = quoted_piece(plain_end, stop)
+        return before + [piece], run_end
+
+    return unfold(step, start)
+
+
+def read_header(buf, encoding):
+    """(names, بداية أول سجل بيانات)"""
+    nl = buf.find(NEWLINE)
+    end = len(buf) if nl == -1 else nl + 1
+    header = buf[:end].rstrip(b"\r\n")
+    if not header:
+        return [], end
+    return read_records(header, encoding)[0], end
+
+
+# -------- Decoding (Pure) --------
+
+def decode_column(col, plain, encoding):
+    if plain:
+        # استدعاء decode واحد لكل عمود؛ حقول الجزء plain لا تحتوي سطراً جديداً
+        return NEWLINE.join(col).decode(encoding).split("\n") if col else []
+    return col  # فكها read_records مسبقاً
+
+
+def parse_number(raw):
+    """تحويل الحقل (bytes خام أو str) إلى float؛ القيم الفارغة أو غير الصالحة -> NaN"""
+    try:
+        return float(raw)
+    except (TypeError, ValueError):
+        return NAN
+
+
+def parse_numeric_column(col):
+    try:
+        return array("d", map(float, col))
+    except (TypeError, ValueError):
+        return array("d", map(parse_number, col))
+
+
+# -------- Loading (Impure, isolated) --------
+
+def with_mmap(path, fn):
+    """
+    [Concept: Higher-Order Function] - تمرير دالة تعمل على البايتات المعينة في الذاكرة
+    """
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # ملف فارغ
+            return fn(b"")
+        with mm:
+            return fn(mm)
+
+
+def selected(names, columns):
+    return names if columns is None else [c for c in columns if c in names]
+
+
+def iter_mmap(path, fn):
+    """
+    مثل with_mmap لكن لمولد (Lazy): الـ mmap يبقى مفتوحاً حتى ينتهي استهلاك المولد
+    """
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # ملف فارغ
+            yield from fn(b"")
+            return
+        with mm:
+            yield from fn(mm)
+
+
+def rows_from_buffer(buf, columns, encoding):
+    names, start = read_header(buf, encoding)
+    keys = selected(names, columns)
+    if not keys:
+        return iter(())
+    idx = [names.index(k) for k in keys]
+    return (dict(zip(keys, values))
+            for cols, plain in iter_batches(buf, idx, start, encoding)
+            for values in zip(*[decode_column(col, plain, encoding) for col in cols]))
+
+
+def iter_csv_mmap(path, columns=None, encoding="utf-8"):
+    """
+    columns: قائمة اختيارية بالحقول المطلوبة؛ باقي الحقول لا يتم فك ترميزها أبداً.
+    الصفوف القصيرة تأخذ None للحقول الناقصة كما في DictReader.
+    """
+    return iter_mmap(path, lambda buf: rows_from_buffer(buf, columns, encoding))
+
+
+def load_csv_mmap(path, columns=None, encoding="utf-8"):
+    return list(iter_csv_mmap(path, columns=columns, encoding=encoding))
+
+
+def load_columns_mmap(path, columns=None, numeric_columns=None, encoding="utf-8"):
+    """
+    تحميل عمودي: {column: values}
+    الأعمدة الرقمية تتحول من bytes إلى array('d') مباشرة (القيم الناقصة -> NaN)، والباقي قوائم str.
+    """
+    numeric_columns = numeric_columns or []
+
+    def read(buf):
+        names, start = read_header(buf, encoding)
+        keys = selected(names, columns)
+        if not keys:
+            return {}
+        idx = [names.index(k) for k in keys]
+
+        def convert(k, col, plain):
+            return parse_numeric_column(col) if k in numeric_columns else decode_column(col, plain, encoding)
+
+        # كل جزء يتحول فوراً (فتتحرر البايتات الخام)، ثم تُدمج الأجزاء مرة واحدة لكل عمود
+        pieces = [[convert(k, col, plain) for k, col in zip(keys, cols)]
+                  for cols, plain in iter_batches(buf, idx, start, encoding)]
+
+        def merge(j, k):
+            values = chain.from_iterable(piece[j] for piece in pieces)
+            return array("d", values) if k in numeric_columns else list(values)
+
+        return {k: merge(j, k) for j, k in enumerate(keys)}
+
+    return with_mmap(path, read)
@@ -1,10 +1,19 @@
 import os
+from datetime import datetime
+from functools import reduce
+from itertools import islice
 from pipeline import (
-    load_csv, handle_missing, standardize_dates, standardize_numbers,
-    filter_rows, compute_sales_growth, aggregate_sum_by_key,
-    analyze_statistics
+    load_csv, iter_csv, handle_missing_masked, standardize_dates, standardize_numbers,
+    filter_rows_masked, compute_sales_growth, aggregate_sum_by_key,
+    iter_numeric_column, analyze_statistics
 )
-from utils import write_csv, safe_float
+from utils import safe_float, for_each
+from nullmask import mask_counts
+from dedup import drop_duplicates, mark_duplicates
+from validation import compile_schema, validate, save_quarantine
+from sinks import open_sinks
+from cache import file_digest, run_stages
+from external import make_spool, external_stats_summary
 
 from visualizer import (
     extract_column, extract_numeric_column, extract_two_numeric_columns,
@@ -16,51 +25,200 @@ DATA_DIR = os.path.join(PROJECT_ROOT, "..", "Data")
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, "..", "Output", "PureFunctionalParadigm")
 VISUAL_DIR = os.path.join(OUTPUT_DIR, "Visuals")
 
+def read_memory_budget(value):
+    """PIPELINE_MEMORY_BUDGET كعدد صفوف، أو None إذا لم يُحدد؛ القيمة 0 لا تقرأ أي صف"""
+    if not value:
+        return None
+    budget = int(value)
+    if budget < 1:
+        raise ValueError(f"PIPELINE_MEMORY_BUDGET must be at least 1, got {value!r}")
+    return budget
+
+
+# "csv" (csv.DictReader) or "mmap" (memory-mapped byte tokenizer)
+CSV_BACKEND = os.environ.get("PIPELINE_CSV_BACKEND", "csv")
+# columns identifying a row; re-sent upstream rows repeat these exactly
+DEDUP_KEYS = ["Date", "Region", "Product"]
+# out-of-core mode (see main_out_of_core): rows are streamed in batches and at most this
+# many groups / values are held in memory before spilling to disk (unset = all in memory)
+MEMORY_BUDGET = read_memory_budget(os.environ.get("PIPELINE_MEMORY_BUDGET"))
+# المراحل تستخدم recursive_map، فدفعة الصفوف تبقى أقل بكثير من حد العودية
+STREAM_BATCH = min(MEMORY_BUDGET, 1000) if MEMORY_BUDGET else None
+STATS_COLUMNS = ["Sales", "SalesGrowth"]
+STATS_PERCENTILES = [25, 75]
+# rows breaking these rules go to quarantine.csv instead of the pipeline
+SCHEMA = {
+    "Date": {"type": "date", "min_date": "2000-01-01", "max_date": "2100-12-31"},
+    "Region": {"allowed": ["North", "South", "East", "West"]},
+    "Sales": {"type": "float", "non_negative": True},
+    "PreviousSales": {"type": "float", "non_negative": True},
+}
+VALIDATION_CHECKS = compile_schema(SCHEMA)
+# comma-separated output sinks: "csv" (files in OUTPUT_DIR) and/or "sqlite" (OUTPUT_DIR/pipeline.db)
+OUTPUT_SINKS = [name.strip() for name in os.environ.get("PIPELINE_SINKS", "csv").split(",") if name.strip()]
+# rerunning with the same run id replaces that run's rows in the database
+RUN_ID = os.environ.get("PIPELINE_RUN_ID") or datetime.now().strftime("%Y%m%dT%H%M%S")
+SQLITE_WAL = os.environ.get("PIPELINE_SQLITE_WAL", "") == "1"
+FILL_VALUES = {
+    "Date": "UNKNOWN",
+    "Region": "UNKNOWN",
+    "Sales": 0.0,
+    "PreviousSales": 0.0,
+    "Product": "UNKNOWN"
+}
+DATE_FIELDS = ["Date"]
+NUMERIC_FIELDS = ["Sales", "PreviousSales"]
+PRECISION = 2
+# stage outputs up to standardize_numbers are cached by input + params; PIPELINE_CACHE=0 disables
+CACHE_DIR = os.path.join(OUTPUT_DIR, "cache") if os.environ.get("PIPELINE_CACHE", "1") != "0" else None
+CACHE_MAX_BYTES = int(os.environ.get("PIPELINE_CACHE_MB", "512")) * 1024 * 1024
+
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(VISUAL_DIR, exist_ok=True)
 
 
-def main():
+# -------- Cached Stages --------
+# [Concept: Immutability] - كل مرحلة تعيد state جديدة بدلاً من تعديل القديمة
+
+def load_stage(_):
+    csv_path = os.path.join(DATA_DIR, "input.csv")
+    rows, dropped = drop_duplicates(load_csv(csv_path, backend=CSV_BACKEND), DEDUP_KEYS)
+
+    input_fields = list(rows[0].keys()) if rows else list(SCHEMA)
+    valid, quarantined, violation_counts = validate(rows, VALIDATION_CHECKS)
+    # تقرير التحميل جزء من النتيجة، فيظهر أيضاً عند القراءة من الـ cache
+    return {"loaded": len(rows), "dropped": dropped, "rows": valid, "input_fields": input_fields,
+            "quarantined": quarantined, "violation_counts": violation_counts}
+
+
+def missing_stage(state):
+    rows, null_masks = handle_missing_masked(state["rows"], fill_values=FILL_VALUES)
+    return {**state, "rows": rows, "null_masks": null_masks}
+
+
+def dates_stage(state):
+    return {**state, "rows": standardize_dates(state["rows"], DATE_FIELDS)}
+
+
+def numbers_stage(state):
+    return {**state, "rows": standardize_numbers(state["rows"], NUMERIC_FIELDS, precision=PRECISION)}
+
+
+STAGES = [
+    ("load", {"backend": CSV_BACKEND, "dedup_keys": DEDUP_KEYS, "schema": SCHEMA}, load_stage),
+    ("handle_missing", {"fill_values": FILL_VALUES}, missing_stage),
+    ("standardize_dates", {"date_fields": DATE_FIELDS}, dates_stage),
+    ("standardize_numbers", {"numeric_fields": NUMERIC_FIELDS, "precision": PRECISION}, numbers_stage),
+]
+
+
+# -------- Shared Steps --------
+
+def transform_rows(rows, null_masks):
+    """Filter (Sales > 1000) ثم SalesGrowth؛ تعيد (rows, null_masks)"""
+    rows, null_masks = filter_rows_masked(rows, lambda r: safe_float(r.get("Sales", 0)) > 1000, null_masks)
+    return compute_sales_growth(rows, "Sales", "PreviousSales", "SalesGrowth"), null_masks
+
+
+def add_counts(a, b):
+    """[Concept: Pure Function] - جمع عدادين بدون تعديل أي منهما"""
+    return {k: a.get(k, 0) + b.get(k, 0) for k in {**a, **b}}
+
+
+def save_outputs(read_rows, agg, stats, null_counts, violation_counts, fieldnames=None):
+    """read_rows: دالة تعيد الصفوف من جديد لكل sink (قائمة، أو مولد يقرأ من spool)"""
+    def save_to(sink):
+        try:
+            clean_out = sink.write_rows("clean_data", read_rows(), indexes=["Date", "Region"], fieldnames=fieldnames)
+            print(f"Saved cleaned data to {clean_out}")
+            print(f"Saved aggregation to {sink.write_aggregate('agg_by_region', agg, key_field='key')}")
+            print(f"Saved analysis summary to {sink.write_summary(stats, null_counts, violation_counts)}")
+        finally:
+            sink.close()
+
+    for_each(save_to, open_sinks(OUTPUT_SINKS, OUTPUT_DIR, RUN_ID, wal=SQLITE_WAL))
+
+
+def main_out_of_core(budget):
+    """
+    نفس مخرجات main بدون تحميل البيانات في الذاكرة: الإدخال يمر على المراحل بدفعات
+    من STREAM_BATCH صف، والصفوف النظيفة والمعزولة وقيم الإحصائيات تُكتب إلى spools مؤقتة،
+    ثم يقرأها التجميع والإحصاء الخارجيان مع budget مجموعة/قيمة على الأكثر في الذاكرة.
+    الـ cache والرسوم تحتاج كل الصفوف في الذاكرة، فلا تُستخدم هنا.
+    """
     csv_path = os.path.join(DATA_DIR, "input.csv")
-    rows = load_csv(csv_path)
-    print(f"Loaded {len(rows)} rows")
-
-    rows = handle_missing(
-        rows,
-        fill_values={
-            "Date": "UNKNOWN",
-            "Region": "UNKNOWN",
-            "Sales": 0.0,
-            "PreviousSales": 0.0,
-            "Product": "UNKNOWN"
+    clean, quarantined = make_spool(), make_spool()
+    values = {col: make_spool() for col in STATS_COLUMNS}
+    marked = mark_duplicates(iter_csv(csv_path, backend=CSV_BACKEND), DEDUP_KEYS, max_in_memory=budget)
+    batches = iter(lambda: list(islice(marked, STREAM_BATCH)), [])
+
+    def step(acc, batch):
+        # [Concept: Fold] - العدادات تنتقل بين الدفعات، والصفوف تذهب إلى الـ spools (IO معزول)
+        rows = [r for r, dup in batch if not dup]
+        valid, bad, violation_counts = validate(rows, VALIDATION_CHECKS)
+        state = numbers_stage(dates_stage(missing_stage({"rows": valid})))
+        clean_rows, null_masks = transform_rows(state["rows"], state["null_masks"])
+        quarantined.append(bad)
+        clean.append(clean_rows)
+        for_each(lambda col: values[col].append(iter_numeric_column(clean_rows, col, null_masks.get(col, 0))),
+                 STATS_COLUMNS)
+        return {
+            "loaded": acc["loaded"] + len(rows),
+            "dropped": acc["dropped"] + len(batch) - len(rows),
+            "quarantined": acc["quarantined"] + len(bad),
+            "input_fields": acc["input_fields"] or (list(rows[0].keys()) if rows else None),
+            "clean_fields": acc["clean_fields"] or (list(clean_rows[0].keys()) if clean_rows else None),
+            "null_counts": add_counts(acc["null_counts"], mask_counts(state["null_masks"])),
+            "violation_counts": add_counts(acc["violation_counts"], violation_counts),
         }
-    )
 
-    rows = standardize_dates(rows, ["Date"])
-    rows = standardize_numbers(rows, ["Sales", "PreviousSales"], precision=2)
-    rows = filter_rows(rows, lambda r: safe_float(r.get("Sales", 0)) > 1000)
-    rows = compute_sales_growth(rows, "Sales", "PreviousSales", "SalesGrowth")
+    initial = {"loaded": 0, "dropped": 0, "quarantined": 0, "input_fields": None, "clean_fields": None,
+               "null_counts": {}, "violation_counts": {}}
+    try:
+        totals = reduce(step, batches, initial)
+        print(f"Loaded {totals['loaded']} rows ({totals['dropped']} duplicates dropped)")
+
+        quarantine_out = os.path.join(OUTPUT_DIR, "quarantine.csv")
+        save_quarantine(quarantined.read(), quarantine_out, totals["input_fields"] or list(SCHEMA))
+        print(f"Quarantined {totals['quarantined']} rows to {quarantine_out}")
+        print(f"Missing values filled: {totals['null_counts']}")
+
+        agg = aggregate_sum_by_key(clean.read(), "Region", "Sales", max_groups=budget)
+        stats = {col: external_stats_summary(values[col].read(), max_in_memory=budget,
+                                             percentiles=STATS_PERCENTILES) for col in STATS_COLUMNS}
+        save_outputs(lambda: clean.read() if totals["clean_fields"] else [], agg, stats,
+                     totals["null_counts"], totals["violation_counts"], fieldnames=totals["clean_fields"])
+    finally:
+        for_each(lambda spool: spool.close(), [clean, quarantined, *values.values()])
+    print("Visualizations skipped in out-of-core mode")
+
+
+def main():
+    if MEMORY_BUDGET is not None:
+        return main_out_of_core(MEMORY_BUDGET)
+
+    # المراحل حتى standardize_numbers تعتمد فقط على ملف الإدخال ومعاملاتها،
+    # فإعادة التشغيل بنفس الإدخال تبدأ بعد أعمق مرحلة محفوظة في الـ cache
+    csv_path = os.path.join(DATA_DIR, "input.csv")
+    state, resumed_from = run_stages(CACHE_DIR, file_digest(csv_path), STAGES, max_bytes=CACHE_MAX_BYTES)
+    if resumed_from:
+        print(f"Resumed from cached {resumed_from} output")
+    print(f"Loaded {state['loaded']} rows ({state['dropped']} duplicates dropped)")
+    rows, null_masks, violation_counts = state["rows"], state["null_masks"], state["violation_counts"]
+
+    quarantine_out = os.path.join(OUTPUT_DIR, "quarantine.csv")
+    save_quarantine(state["quarantined"], quarantine_out, state["input_fields"])
+    print(f"Quarantined {len(state['quarantined'])} rows to {quarantine_out}")
+
+    null_counts = mask_counts(null_masks)
+    print(f"Missing values filled: {null_counts}")
+
+    rows, null_masks = transform_rows(rows, null_masks)
     agg = aggregate_sum_by_key(rows, "Region", "Sales")
-    stats = analyze_statistics(rows, ["Sales", "SalesGrowth"])
-
-    # Save outputs
-    clean_out = os.path.join(OUTPUT_DIR, "clean_data.csv")
-    write_csv(clean_out, fieldnames=list(rows[0].keys()), rows=rows)
-    print(f"Saved cleaned data to {clean_out}")
-
-    agg_out = os.path.join(OUTPUT_DIR, "agg_by_region.csv")
-    write_csv(agg_out, fieldnames=list(agg[0].keys()), rows=agg)
-    print(f"Saved aggregation to {agg_out}")
-
-    summary_out = os.path.join(OUTPUT_DIR, "analysis_summary.txt")
-    with open(summary_out, "w", encoding="utf-8") as f:
-        for col, s in stats.items():
-            f.write(f"Column: {col}\n")
-            for k, v in s.items():
-                f.write(f"  {k}: {v}\n")
-            f.write("\n")
-    print(f"Saved analysis summary to {summary_out}")
-    
+    stats = analyze_statistics(rows, STATS_COLUMNS, exclude_masks=null_masks, percentiles=STATS_PERCENTILES)
+
+    # Save outputs to every configured sink
+    save_outputs(lambda: rows, agg, stats, null_counts, violation_counts)
 
     # 1. Line Chart: Sales Over Time
     dates = extract_column(rows, "Date")
@@ -0,0 +1,58 @@
+import re
+from functools import reduce
+from operator import or_
+
+# ==========================================
+#  Per-column Null Masks
+# ==========================================
+# القناع (mask) هو عدد صحيح يستخدم كـ bitset:
+# البت i يساوي 1 إذا كان الصف i لا يحتوي على قيمة للعمود.
+# العمليات (&, |, bit_count) تعمل على العمود كاملاً دفعة واحدة بدلاً من حقل بحقل.
+# [Concept: Immutability] - الأعداد الصحيحة غير قابلة للتغيير، فكل عملية تنتج قناعاً جديداً
+
+NULL_VALUES = (None, "")
+ONE = re.compile("1")
+
+
+def mask_from_flags(flags):
+    """قناع من قائمة قيم منطقية: flags[i] -> البت i"""
+    # الصف 0 -> البت الأقل أهمية، لذلك نعكس ترتيب الأعلام
+    bits = "".join(reversed(["1" if f else "0" for f in flags]))
+    return int(bits, 2) if bits else 0
+
+
+def null_mask(rows, field):
+    return mask_from_flags([r.get(field) in NULL_VALUES for r in rows])
+
+
+def null_masks(rows, fields):
+    """{field: mask} لكل حقل"""
+    return {f: null_mask(rows, f) for f in fields}
+
+
+def any_mask(masks, fields=None):
+    """[Concept: Fold] - OR لأقنعة الحقول: الصفوف التي ينقصها أي منها"""
+    keys = masks.keys() if fields is None else fields
+    return reduce(or_, (masks.get(f, 0) for f in keys), 0)
+
+
+def mask_counts(masks):
+    return {f: m.bit_count() for f, m in masks.items()}
+
+
+def mask_flags(mask, n):
+    """نص من n أعلام '0'/'1' حيث flags[i] هو البت i"""
+    return bin(mask)[:1:-1].ljust(n, "0")[:n]
+
+
+def mask_indices(mask):
+    return [m.start() for m in ONE.finditer(bin(mask)[:1:-1])]
+
+
+def select_mask(mask, keep):
+    """قناع القائمة الجزئية المكونة من الصفوف في المواقع keep (بالترتيب)"""
+    if not mask or not keep:
+        return 0
+    flags = bin(mask)[:1:-1]
+    selected = "".join(reversed([flags[i] if i < len(flags) else "0" for i in keep]))
+    return int(selected, 2)
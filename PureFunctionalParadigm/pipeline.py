@@ -1,7 +1,11 @@
 import csv
 import json
 import sys
+from itertools import repeat
 from utils import parse_date, safe_float, stats_summary
+from fast_csv import load_csv_mmap, iter_csv_mmap
+from external import external_group_sum, external_stats_summary
+from nullmask import NULL_VALUES, null_masks, any_mask, mask_flags, select_mask
 
 # زيادة حد العودية لأننا سنعتمد عليها كلياً بدلاً من الحلقات
 sys.setrecursionlimit(5000)
@@ -9,12 +13,33 @@ sys.setrecursionlimit(5000)
 
 # -------- Loading --------
 # (IO operations remain Impure by definition, but we keep them isolated)
-def load_csv(path):
+def load_csv(path, backend="csv", columns=None):
+    """
+    backend: "csv" (csv.DictReader) أو "mmap" (fast_csv)
+    columns: الحقول المطلوبة فقط (تستخدم مع mmap لتجنب فك ترميز باقي الحقول)
+    """
+    if backend == "mmap":
+        return load_csv_mmap(path, columns=columns)
+    if backend != "csv":
+        raise ValueError(f"Unknown CSV backend: {backend}")
     with open(path, encoding="utf-8") as f:
         reader = csv.DictReader(f)
         return [dict(r) for r in reader]
 
 
+def iter_csv(path, backend="csv", columns=None):
+    """
+    نسخة Streaming من load_csv: مولد كسول (Lazy) يعيد صفاً واحداً في كل مرة
+    """
+    if backend == "mmap":
+        yield from iter_csv_mmap(path, columns=columns)
+        return
+    if backend != "csv":
+        raise ValueError(f"Unknown CSV backend: {backend}")
+    with open(path, encoding="utf-8") as f:
+        yield from map(dict, csv.DictReader(f))
+
+
 def load_json(path):
     with open(path, encoding="utf-8") as f:
         data = json.load(f)
@@ -74,16 +99,29 @@ def recursive_filter(condition_fn, lst, acc=None):
 # -------- Cleaning --------
 
 def handle_missing(rows, fill_values=None):
+    return handle_missing_masked(rows, fill_values)[0]
+
+
+def handle_missing_masked(rows, fill_values=None):
+    """
+    تعيد (rows, masks) حيث masks = {field: null mask} (انظر nullmask.py)
+    الأقنعة تحسب لكل عمود دفعة واحدة، ثم لا نعيد بناء إلا الصفوف التي تحتوي على قيمة ناقصة.
+    """
     # [Concept: Contextual Environment / Closure, CE/Clousure]
     # المتغير fill_values موجود في البيئة الخارجية ويتم استدعاؤه داخل fill_row
     fill_values = fill_values or {}
+    rows = list(rows)  # قد تكون مولداً (iter_csv)، والأقنعة تقرؤها مرة لكل عمود
+    masks = null_masks(rows, list(fill_values))
+    flags = mask_flags(any_mask(masks), len(rows))
 
     def fill_row(r):
         # [Concept: Functional / Stateless] - Creating new dict
-        return {k: (v if v not in [None, ""] else fill_values.get(k, v)) for k, v in r.items()}
+        # الحقول الغائبة من الصف تُضاف أيضاً، لأن القناع يعتبرها ناقصة (r.get -> None)
+        filled = {k: (v if v not in NULL_VALUES else fill_values.get(k, v)) for k, v in r.items()}
+        return {**filled, **{k: v for k, v in fill_values.items() if k not in r}}
 
-    # [Concept: Recursion instead of Loop]
-    return recursive_map(fill_row, rows)
+    # الصفوف الكاملة تُشارك كما هي (Structural Sharing) لأننا لا نعدل أي صف
+    return [fill_row(r) if flag == "1" else r for r, flag in zip(rows, flags)], masks
 
 
 def standardize_dates(rows, date_fields):
@@ -111,6 +149,14 @@ def filter_rows(rows, condition_fn):
     return recursive_filter(condition_fn, rows)
 
 
+def filter_rows_masked(rows, condition_fn, masks):
+    """
+    مثل filter_rows لكن تعيد (rows, masks) بحيث تتبع الأقنعة الصفوف المتبقية
+    """
+    keep = [i for i, r in enumerate(rows) if condition_fn(r)]
+    return [rows[i] for i in keep], {f: select_mask(m, keep) for f, m in masks.items()}
+
+
 def compute_sales_growth(rows, current_column="Sales", previous_column="PreviousSales", new_column="SalesGrowth"):
     # [Concept: Closure] capturing column names
     def compute_row(r):
@@ -124,12 +170,15 @@ def compute_sales_growth(rows, current_column="Sales", previous_column="Previous
 
 # -------- Aggregation --------
 
-def aggregate_sum_by_key(rows, key_field, sum_field):
+def aggregate_sum_by_key(rows, key_field, sum_field, max_groups=None):
     """
     تنفيذ التجميع باستخدام العودية الذيلية والمراكم (Dictionary Accumulator).
     هذا يطبق مبدأ Invariant Programming بوضوح:
     كل خطوة تنقل قيمة من القائمة (S) إلى المراكم (A).
+    max_groups: وضع out-of-core؛ المجاميع الجزئية تُكتب إلى القرص كـ runs مرتبة (انظر external.py)
     """
+    if max_groups is not None:
+        return external_group_sum(rows, key_field, sum_field, max_groups=max_groups)
 
     # Helper recursive function (Invariant Loop)
     def aggregate_recursive(lst, accumulator):
@@ -166,7 +215,8 @@ def aggregate_sum_by_key(rows, key_field, sum_field):
 
 # -------- Analysis --------
 
-def numeric_column_list(rows, column):
+def numeric_column_list(rows, column, skip_mask=0):
+    """skip_mask: الصفوف التي بتها 1 يتم تجاهلها (مثلاً القيم التي ملأتها handle_missing)"""
     # دالة مساعدة لاستخراج القيمة
     def get_val(r):
         return safe_float(r.get(column))
@@ -175,25 +225,66 @@ def numeric_column_list(rows, column):
     def is_valid(r):
         return r.get(column) not in [None, ""]
 
+    flags = mask_flags(skip_mask, len(rows))
+    unmasked = [r for r, flag in zip(rows, flags) if flag == "0"] if skip_mask else rows
     # 1. Filter valid rows (Recursive)
-    valid_rows = recursive_filter(is_valid, rows)
+    valid_rows = recursive_filter(is_valid, unmasked)
     # 2. Map to numbers (Recursive)
     return recursive_map(get_val, valid_rows)
 
 
-def analyze_statistics(rows, numeric_columns):
+def iter_numeric_column(rows, column, skip_mask=0):
+    """
+    نسخة كسولة (Lazy) من numeric_column_list: مولد يعيد القيم واحدة واحدة
+    (مثلاً إلى external_stats_summary بدون بناء قائمة، وبدون عودية بعمق عدد الصفوف)
+    """
+    flags = mask_flags(skip_mask, len(rows)) if skip_mask else repeat("0")
+    return (safe_float(r.get(column)) for r, flag in zip(rows, flags)
+            if flag == "0" and r.get(column) not in [None, ""])
+
+
+def analyze_statistics(rows, numeric_columns, exclude_masks=None, percentiles=(), max_in_memory=None):
     # [Concept: Higher-Order Function & Recursion]
-    
+    # exclude_masks: {column: null mask} اختياري؛ الصفوف المقنعة لا تدخل في إحصائيات العمود
+    # percentiles: قيم p<N> إضافية لكل عمود (مثلاً [25, 75])
+    # max_in_memory: وضع out-of-core؛ القيم تُرتب خارجياً في runs بهذا الحجم
+    exclude_masks = exclude_masks or {}
+
+    def summarize(col):
+        skip_mask = exclude_masks.get(col, 0)
+        if max_in_memory is not None:
+            return external_stats_summary(iter_numeric_column(rows, col, skip_mask),
+                                          max_in_memory=max_in_memory, percentiles=percentiles)
+        return stats_summary(numeric_column_list(rows, col, skip_mask), percentiles=percentiles)
+
     def analyze_cols_recursive(cols, acc):
         if not cols:
             return acc
 
         head_col, *tail_cols = cols
-        vals = numeric_column_list(rows, head_col)
 
         new_acc = acc.copy()
-        new_acc[head_col] = stats_summary(vals)
+        new_acc[head_col] = summarize(head_col)
 
         return analyze_cols_recursive(tail_cols, new_acc)
 
-    return analyze_cols_recursive(numeric_columns, {})
\ No newline at end of file
+    return analyze_cols_recursive(numeric_columns, {})
+
+
+# -------- Output Helpers --------
+
+def summary_lines(summary_dict, null_counts=None, violation_counts=None):
+    """[Concept: Pure Function] - نص الملخص كقائمة أسطر، والكتابة منفصلة عنه"""
+    def section(title, items):
+        return [title] + [f"  {k}: {v}" for k, v in items] + [""]
+
+    return (
+        [line for col, s in summary_dict.items() for line in section(f"Column: {col}", s.items())]
+        + (section("Missing values", null_counts.items()) if null_counts else [])
+        + (section("Validation", violation_counts.items()) if violation_counts else [])
+    )
+
+
+def save_analysis_summary(summary_dict, output_path, null_counts=None, violation_counts=None):
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(summary_lines(summary_dict, null_counts, violation_counts)) + "\n")
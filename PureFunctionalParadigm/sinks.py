@@ -0,0 +1,252 @@
+import os
+import sqlite3
+from collections import namedtuple
+from itertools import chain, islice
+from operator import itemgetter
+from utils import write_csv, for_each
+from nullmask import NULL_VALUES
+from pipeline import save_analysis_summary
+
+# ==========================================
+#  Output Sinks (CSV files / SQLite bulk loader)
+# ==========================================
+# الـ sink هو مجموعة من ثلاث دوال كتابة، فيمكن لـ main إرسال النتائج إلى أي مجموعة منها:
+#   write_rows(name, rows, indexes=(), fieldnames=None)  -- الصفوف النظيفة
+#   write_aggregate(name, rows, key_field)               -- صف واحد لكل مفتاح
+#   write_summary(stats, null_counts, violation_counts)
+#
+# csv_sink يكتب نفس الملفات القديمة في Output/<Paradigm>/،
+# و sqlite_sink يحمل نفس البيانات إلى جداول typed لأدوات الـ BI.
+# كل جدول فيه عمود run_id: إعادة التشغيل بنفس run_id تستبدل صفوفه في كل الجداول
+# (مفتاح الـ aggregates والـ stats هو (run_id, key)).
+
+BATCH_SIZE = 50_000  # صفوف لكل استدعاء executemany؛ تحميل الجدول كاملاً transaction واحدة
+
+Sink = namedtuple("Sink", "write_rows write_aggregate write_summary close")
+
+
+# -------- Pure Helpers --------
+
+def quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def sql_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def is_real(value):
+    try:
+        float(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def infer_types(rows, fieldnames):
+    """{field: "REAL" | "TEXT"}: REAL إذا كانت كل القيم غير الفارغة أرقاماً"""
+    def column_type(f):
+        distinct = {r.get(f) for r in rows} - set(NULL_VALUES)
+        return "REAL" if distinct and all(map(is_real, distinct)) else "TEXT"
+
+    return {f: column_type(f) for f in fieldnames}
+
+
+def iter_values(rows, fields):
+    """tuples المعاملات بترتيب fields (None للمفاتيح الناقصة)"""
+    # itemgetter لحقل واحد يعيد القيمة نفسها وليس tuple
+    getter = itemgetter(*fields) if len(fields) > 1 else (lambda r: (r[fields[0]],))
+
+    def values(r):
+        try:
+            return getter(r)
+        except KeyError:
+            return tuple(map(r.get, fields))
+
+    return map(values, rows)
+
+
+def insert_sql(table, run_id, fields, conflict=None):
+    """
+    INSERT لـ (run_id, *fields) بمعاملات fields فقط.
+    run_id يُكتب كـ literal فلا نحتاج لدمج tuple لكل صف؛
+    NULLIF يحول الحقول الفارغة إلى NULL، و REAL affinity تحول النصوص الرقمية، كلاهما داخل SQLite.
+    """
+    columns = ", ".join(map(quote, ["run_id"] + list(fields)))
+    params = ", ".join(["NULLIF(?, '')"] * len(fields))
+    sql = f"INSERT INTO {quote(table)} ({columns}) VALUES ({sql_literal(run_id)}, {params})"
+    if conflict is None:
+        return sql
+    key, updates = conflict
+    action = ("DO UPDATE SET " + ", ".join(f"{quote(c)} = excluded.{quote(c)}" for c in updates)
+              if updates else "DO NOTHING")
+    return sql + f" ON CONFLICT ({', '.join(map(quote, ['run_id'] + list(key)))}) {action}"
+
+
+def create_table_sql(table, types, primary_key=None):
+    cols = ["run_id TEXT NOT NULL"] + [f"{quote(c)} {t}" for c, t in types.items()]
+    pk = [f"PRIMARY KEY ({', '.join(map(quote, primary_key))})"] if primary_key else []
+    return f"CREATE TABLE {quote(table)} ({', '.join(cols + pk)})"
+
+
+# -------- SQLite (Impure, isolated) --------
+
+def in_transaction(conn, action):
+    """[Concept: Higher-Order Function] - action(conn) داخل BEGIN/COMMIT، و ROLLBACK عند الفشل"""
+    conn.execute("BEGIN")
+    try:
+        result = action(conn)
+        conn.execute("COMMIT")
+        return result
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+
+def ensure_table(conn, table, types, primary_key=None):
+    """ينشئ الجدول، أو يضيف الأعمدة التي لم تكن في تشغيل سابق"""
+    existing = [c[1] for c in conn.execute(f"PRAGMA table_info({quote(table)})")]
+    statements = ([create_table_sql(table, types, primary_key)] if not existing else
+                  [f"ALTER TABLE {quote(table)} ADD COLUMN {quote(c)} {t}"
+                   for c, t in types.items() if c not in existing])
+    for_each(conn.execute, statements)
+
+
+def clear_run(conn, run_id, table):
+    """يحذف صفوف run_id من الجدول (إن وُجد)"""
+    if conn.execute(f"PRAGMA table_info({quote(table)})").fetchone():
+        conn.execute(f"DELETE FROM {quote(table)} WHERE run_id = ?", (str(run_id),))
+
+
+def insert_batches(conn, sql, values, batch_size=BATCH_SIZE):
+    it = iter(values)
+    for_each(lambda batch: conn.executemany(sql, batch),
+             iter(lambda: list(islice(it, batch_size)), []))
+
+
+def load_rows(conn, run_id, name, rows, indexes=(), fieldnames=None, batch_size=BATCH_SIZE):
+    """
+    يستبدل صفوف run_id في الجدول name.
+    الفهارس (run_id + indexes) تُحذف قبل التحميل وتُبنى بعده؛ الأنواع تُستنتج من أول batch_size صف.
+    """
+    it = iter(rows)
+    head = list(islice(it, batch_size))
+    fields = list(fieldnames) if fieldnames is not None else (list(head[0].keys()) if head else [])
+    if not fields:
+        # لا شيء للتحميل، لكن إعادة التشغيل يجب ألا تُبقي صفوف run_id القديمة
+        clear_run(conn, run_id, name)
+        return
+    index_cols = [("run_id", f"{name}_run_id")] + [(c, f"{name}_{c}") for c in indexes]
+
+    def load(conn):
+        ensure_table(conn, name, infer_types(head, fields))
+        clear_run(conn, run_id, name)
+        for_each(lambda ci: conn.execute(f"DROP INDEX IF EXISTS {quote(ci[1])}"), index_cols)
+        insert_batches(conn, insert_sql(name, run_id, fields), iter_values(chain(head, it), fields), batch_size)
+        for_each(lambda ci: conn.execute(f"CREATE INDEX {quote(ci[1])} ON {quote(name)} ({quote(ci[0])})"),
+                 index_cols)
+
+    in_transaction(conn, load)
+
+
+def upsert_rows(conn, run_id, table, types, key, rows):
+    """
+    يستبدل صفوف run_id في الجدول بـ rows (tuples بدون run_id).
+    المفتاح الأساسي (run_id, *key)؛ المفتاح المكرر داخل rows يأخذ آخر قيمه.
+    """
+    updates = [c for c in types if c not in key]
+    sql = insert_sql(table, run_id, list(types), conflict=(key, updates))
+
+    def load(conn):
+        ensure_table(conn, table, types, primary_key=["run_id"] + list(key))
+        # المفاتيح الغائبة عن هذه الكتابة يجب ألا تبقى من كتابة سابقة
+        clear_run(conn, run_id, table)
+        insert_batches(conn, sql, rows)
+
+    in_transaction(conn, load)
+
+
+def upsert_aggregate(conn, run_id, name, rows, key_field="key"):
+    if not rows:
+        clear_run(conn, run_id, name)
+        return
+    fields = list(rows[0].keys())
+    types = {**infer_types(rows, fields), key_field: "TEXT"}
+    upsert_rows(conn, run_id, name, types, [key_field], iter_values(rows, fields))
+
+
+def upsert_summary(conn, run_id, stats, null_counts=None, violation_counts=None):
+    """stats -> stats(run_id, column, stat, value)؛ العدادات -> quality(run_id, kind, name, count)"""
+    stat_rows = [(col, k, v) for col, s in stats.items() for k, v in s.items()]
+    upsert_rows(conn, run_id, "stats", {"column": "TEXT", "stat": "TEXT", "value": "REAL"},
+                ["column", "stat"], stat_rows)
+    count_rows = [(kind, name, n)
+                  for kind, counts in (("missing", null_counts), ("violation", violation_counts))
+                  for name, n in (counts or {}).items()]
+    upsert_rows(conn, run_id, "quality", {"kind": "TEXT", "name": "TEXT", "count": "INTEGER"},
+                ["kind", "name"], count_rows)
+
+
+def open_sqlite(path, wal=False):
+    # autocommit: الـ transactions تُفتح صراحة حول كل تحميل (in_transaction)
+    conn = sqlite3.connect(path, isolation_level=None)
+    pragmas = ["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"] if wal else []
+    for_each(conn.execute, pragmas)
+    return conn
+
+
+# -------- Sinks --------
+
+def csv_sink(output_dir):
+    """ملفات <name>.csv و analysis_summary.txt في output_dir"""
+    def write_rows(name, rows, indexes=(), fieldnames=None):
+        path = os.path.join(output_dir, f"{name}.csv")
+        if fieldnames is None and not rows:
+            return path
+        write_csv(path, list(fieldnames) if fieldnames is not None else list(rows[0].keys()), rows)
+        return path
+
+    def write_summary(stats, null_counts=None, violation_counts=None):
+        path = os.path.join(output_dir, "analysis_summary.txt")
+        save_analysis_summary(stats, path, null_counts, violation_counts)
+        return path
+
+    return Sink(write_rows, lambda name, rows, key_field="key": write_rows(name, rows),
+                write_summary, lambda: None)
+
+
+def sqlite_sink(path, run_id, wal=False, batch_size=BATCH_SIZE):
+    """
+    Bulk loader: executemany بدفعات batch_size داخل transaction واحدة لكل جدول،
+    والفهارس تُبنى بعد التحميل. wal=True: وضع WAL مع synchronous=NORMAL
+    حتى لا يُمنع القراء أثناء التحميل.
+    [Concept: Closure] - الاتصال و run_id محبوسان داخل دوال الـ sink
+    """
+    conn = open_sqlite(path, wal)
+
+    def write_rows(name, rows, indexes=(), fieldnames=None):
+        load_rows(conn, run_id, name, rows, indexes, fieldnames, batch_size)
+        return path
+
+    def write_aggregate(name, rows, key_field="key"):
+        upsert_aggregate(conn, run_id, name, rows, key_field)
+        return path
+
+    def write_summary(stats, null_counts=None, violation_counts=None):
+        upsert_summary(conn, run_id, stats, null_counts, violation_counts)
+        return path
+
+    return Sink(write_rows, write_aggregate, write_summary, conn.close)
+
+
+def open_sinks(names, output_dir, run_id, wal=False):
+    """sinks من الأسماء ("csv", "sqlite")؛ ValueError للأسماء غير المعروفة"""
+    makers = {
+        "csv": lambda: csv_sink(output_dir),
+        "sqlite": lambda: sqlite_sink(os.path.join(output_dir, "pipeline.db"), run_id, wal),
+    }
+    unknown = [n for n in names if n not in makers]
+    if unknown:
+        raise ValueError(f"Unknown output sink: {unknown[0]!r} (expected 'csv' or 'sqlite')")
+    return [makers[n]() for n in names]
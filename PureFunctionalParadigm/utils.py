@@ -1,5 +1,7 @@
 from datetime import datetime
 import csv
+from collections import deque
+import math
 import statistics
 import sys
 
@@ -45,7 +47,17 @@ def safe_float(value, default=0.0):
         return default
 
 
-def stats_summary(values):
+def percentile(sorted_values, p):
+    """
+    p-th percentile (0-100) لقائمة مرتبة، مع interpolation خطي بين الرتب.
+    """
+    pos = (len(sorted_values) - 1) * p / 100
+    lo = math.floor(pos)
+    w = pos - lo
+    return sorted_values[lo] if w == 0 else sorted_values[lo] * (1 - w) + sorted_values[lo + 1] * w
+
+
+def stats_summary(values, percentiles=()):
 
     # دالة عودية لتصفية القيم None (بديل لـ List Comprehension)
     def recursive_clean(lst, acc=None):
@@ -69,36 +81,36 @@ def stats_summary(values):
 
     # ملاحظة: دوال statistics هي دوال جاهزة وتعتبر "black box".
     # في البرمجة الوظيفية، استخدام دوال المكتبات مقبول طالما لا تغير الحالة (Pure).
+    ordered = sorted(clean_values) if percentiles else []
     return {
         "count": len(clean_values),
         "mean": statistics.mean(clean_values),
         "median": statistics.median(clean_values),
         "variance": statistics.pvariance(clean_values) if len(clean_values) > 1 else 0.0,
         "min": min(clean_values),
-        "max": max(clean_values)
+        "max": max(clean_values),
+        **{f"p{p}": percentile(ordered, p) for p in percentiles}
     }
 
 
 
 
+def for_each(fn, items):
+    """
+    تطبيق fn على كل عنصر من أجل الأثر الجانبي فقط (IO)، بدون بناء قائمة نتائج.
+    بديل لـ list(map(...)) عندما يكون عدد العناصر غير محدود فلا تصلح العودية.
+    """
+    deque(map(fn, items), maxlen=0)
+
+
 def write_csv(path, fieldnames, rows):
     """
     كتابة ملف CSV.
-    على الرغم من أنها Impure، سنستخدم العودية للتحكم في التكرار بدلاً من for loop.
+    على الرغم من أنها Impure، لا نستخدم for loop: writerows تستهلك rows كاملة (قائمة أو مولد كسول).
     تطبيقاً لمبدأ: Functional programs do not contain loops [Section 2].
+    (العودية صفاً بصف كانت تتجاوز حد العودية مع أكثر من بضعة آلاف صف)
     """
     with open(path, "w", newline='', encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
-
-        # دالة عودية للكتابة صف بصف
-        # [Concept: Tail Recursion replacing Loop]
-        def write_rows_recursive(row_list):
-            if not row_list:
-                return
-
-            head, *tail = row_list
-            writer.writerow(head)  # Side Effect
-            write_rows_recursive(tail)
-
-        write_rows_recursive(rows)
\ No newline at end of file
+        writer.writerows(rows)  # Side Effect
@@ -0,0 +1,206 @@
+import math
+from collections import namedtuple
+from datetime import date, datetime
+from functools import reduce
+from itertools import compress, repeat
+from operator import gt, is_not, lt, or_
+from nullmask import NULL_VALUES, mask_from_flags, mask_flags
+from utils import parse_date, write_csv
+
+# ==========================================
+#  Schema Validation (compiled per column)
+# ==========================================
+# الـ schema يربط كل عمود بقيوده، مثلاً:
+#   {"Sales": {"type": "float", "min": 0},
+#    "Region": {"allowed": ["North", "South"]},
+#    "Date": {"type": "date", "min_date": "2020-01-01"}}
+#
+# compile_schema تحولها مرة واحدة إلى دالة فحص لكل عمود.
+# دالة الفحص تحول كل قيمة *مختلفة* مرة واحدة فقط (float أو تاريخ)، وتطبق كل القواعد على القيم المحولة،
+# ثم تعيد القيم الفاشلة إلى الصفوف كـ bitmask (انظر nullmask.py)؛
+# فالعمود السليم يكلف set() واحدة وتحويلاً واحداً لكل قيمة مختلفة.
+# القيم الفارغة تنجح في كل القواعد؛ القيم الناقصة مسؤولية handle_missing.
+
+VIOLATIONS_FIELD = "violations"
+
+
+# -------- Parsers (Pure: value -> parsed value أو None) --------
+
+def to_float(value):
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return None
+    return v if math.isfinite(v) else None
+
+
+def ascii_digits(s):
+    return s.isascii() and s.isdigit()
+
+
+def from_iso(value):
+    try:
+        date.fromisoformat(value)
+        return value
+    except ValueError:
+        return None
+
+
+def from_day_first(value):
+    """DD/MM/YYYY -> ISO، أو None (وعندها تجرب parse_date صيغة %m/%d/%Y)"""
+    try:
+        return date(int(value[6:]), int(value[3:5]), int(value[:2])).isoformat()
+    except ValueError:
+        return None
+
+
+def via_parse_date(value):
+    # parse_date تعيد النص الأصلي إذا فشلت، لذلك نتحقق من نتيجتها
+    # إلا إذا تغير النص (التحويل الناجح يعود دائماً بصيغة YYYY-MM-DD)
+    parsed = parse_date(value)
+    if parsed != value and len(parsed) == 10:
+        return parsed
+    try:
+        datetime.strptime(parsed, "%Y-%m-%d")
+        return parsed
+    except (TypeError, ValueError):
+        return None
+
+
+def iso_date(value):
+    """التاريخ بصيغة ISO أو None إذا لم تنجح أي صيغة"""
+    value = str(value)
+    # مسارات سريعة لأول صيغتين في parse_date (%Y-%m-%d ثم %d/%m/%Y)؛
+    # السنوات قبل 1000 تُترك لـ parse_date لأنها لا تضيف أصفاراً في بدايتها
+    if (len(value) == 10 and value[0] != "0" and value[4] == value[7] == "-"
+            and ascii_digits(value[:4] + value[5:7] + value[8:])):
+        return from_iso(value)
+    day_first = (from_day_first(value)
+                 if len(value) == 10 and value[2] == value[5] == "/" and value[6] != "0"
+                 and ascii_digits(value[:2] + value[3:5] + value[6:]) else None)
+    return day_first or via_parse_date(value)
+
+
+def parse_floats(values):
+    """to_float على عمود كامل: تمريرة float() واحدة (في C) إذا كانت كل القيم أرقاماً منتهية"""
+    try:
+        parsed = list(map(float, values))
+    except (TypeError, ValueError):
+        return list(map(to_float, values))
+    return parsed if all(map(math.isfinite, parsed)) else list(map(to_float, values))
+
+
+def parse_dates(values):
+    return list(map(iso_date, values))
+
+
+# parsers على مستوى العمود: values -> parsed values (None للقيم التي لا تتحول)
+PARSERS = {"float": parse_floats, "date": parse_dates}
+
+# القيم المختلفة لعمود بعد parser واحد: raw القيم التي تحولت، values ما تحولت إليه،
+# و untyped القيم التي لم تتحول
+ParsedColumn = namedtuple("ParsedColumn", "raw values untyped")
+
+
+def parse_column(distinct, parse_values=None):
+    if parse_values is None:
+        return ParsedColumn(distinct, distinct, frozenset())
+    parsed = parse_values(distinct)
+    typed = list(map(is_not, parsed, repeat(None)))
+    raw = list(compress(distinct, typed))
+    return ParsedColumn(raw, list(compress(parsed, typed)), set(distinct).difference(raw))
+
+
+# -------- Rules (Pure: ParsedColumn -> القيم الفاشلة) --------
+# القاعدة (name, parser, failing): parser مفتاح في PARSERS (None: القيمة الخام)،
+# و failing(column) تعيد القيم الخام التي تخالف القاعدة.
+# [Concept: Vectorization] - القواعد عمليات map/compress/set على العمود كله، بدون كود Python لكل قيمة
+
+def type_rule(column):
+    return column.untyped
+
+
+def bound_rule(fails, bound):
+    # [Concept: Higher-Order Function] - fails مثل operator.lt للحد الأدنى
+    # قواعد الحدود لا تحكم إلا على القيم من النوع الصحيح (القيمة من النوع الخطأ تفشل في ".type" وحدها)
+    return lambda column: set(compress(column.raw, map(fails, column.values, repeat(bound))))
+
+
+def allowed_rule(allowed):
+    allowed = frozenset(allowed)  # تُبنى مرة واحدة عند الترجمة، لا لكل قيمة
+    return lambda column: set(column.raw).difference(allowed)
+
+
+def build_rules(column, spec):
+    """[(rule_name, parser, failing)] لعمود واحد"""
+    # [Concept: Closure] - كل قاعدة تحتفظ بحدودها من spec
+    # [Concept: Lazy Evaluation] - make لا تُستدعى إلا للقواعد المفعلة
+    candidates = [
+        ("type", spec.get("type") in PARSERS, lambda: (spec["type"], type_rule)),
+        ("min", "min" in spec, lambda: ("float", bound_rule(lt, spec["min"]))),
+        ("max", "max" in spec, lambda: ("float", bound_rule(gt, spec["max"]))),
+        ("non_negative", spec.get("non_negative", False), lambda: ("float", bound_rule(lt, 0))),
+        ("allowed", "allowed" in spec, lambda: (None, allowed_rule(spec["allowed"]))),
+        ("min_date", "min_date" in spec, lambda: ("date", bound_rule(lt, spec["min_date"]))),
+        ("max_date", "max_date" in spec, lambda: ("date", bound_rule(gt, spec["max_date"]))),
+    ]
+    return [(f"{column}.{name}", *make()) for name, active, make in candidates if active]
+
+
+# -------- Compilation --------
+
+def compile_column_check(rules):
+    """
+    check(values) -> {rule_name: failing-row mask}
+    كل قيمة مختلفة غير فارغة تتحول مرة واحدة لكل parser، ثم تعمل كل القواعد على العمود المحول.
+    """
+    def check(values):
+        distinct = list(set(values) - set(NULL_VALUES))
+        columns = {parser: parse_column(distinct, PARSERS.get(parser)) for parser in {p for _, p, _ in rules}}
+
+        def rule_mask(failing, column):
+            bad = failing(column)
+            return mask_from_flags(list(map(bad.__contains__, values))) if bad else 0
+
+        return {name: rule_mask(failing, columns[parser]) for name, parser, failing in rules}
+
+    return check
+
+
+def compile_schema(schema):
+    """[(column, check)] لتمريرها إلى validate"""
+    compiled = [(column, build_rules(column, spec)) for column, spec in schema.items()]
+    return [(column, compile_column_check(rules)) for column, rules in compiled if rules]
+
+
+# -------- Validation Stage --------
+
+def validate(rows, compiled):
+    """
+    تعيد (valid, quarantined, counts):
+    quarantined نسخ من الصفوف الفاشلة مع حقل إضافي "violations" بأسماء القواعد،
+    و counts = {rule_name: عدد الصفوف الفاشلة}.
+    """
+    rule_masks = {name: m
+                  for column, check in compiled
+                  for name, m in check([r.get(column) for r in rows]).items()}
+    counts = {name: m.bit_count() for name, m in rule_masks.items()}
+    failed = reduce(or_, rule_masks.values(), 0)
+    if not failed:
+        return rows, [], counts
+
+    flags = mask_flags(failed, len(rows))
+    rule_flags = [(name, mask_flags(m, len(rows))) for name, m in rule_masks.items() if m]
+
+    def violations(i):
+        return ";".join(name for name, f in rule_flags if f[i] == "1")
+
+    valid = [r for r, flag in zip(rows, flags) if flag == "0"]
+    quarantined = [{**r, VIOLATIONS_FIELD: violations(i)}
+                   for i, (r, flag) in enumerate(zip(rows, flags)) if flag == "1"]
+    return valid, quarantined, counts
+
+
+def save_quarantine(rows, output_path, fieldnames):
+    # يكتب دائماً (العناوين فقط إذا لم يفشل شيء) حتى لا يبقى ملف قديم
+    write_csv(output_path, list(fieldnames) + [VIOLATIONS_FIELD], rows)
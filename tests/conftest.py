@@ -0,0 +1,37 @@
+# conftest.py
+# Both paradigms ship modules with the same names (utils, pipeline, ...)
+# that import each other by bare name, so a test picks one paradigm's
+# directory and imports from it; every test runs once per paradigm.
+import importlib
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+PARADIGMS = ["ImperativeParadigm", "PureFunctionalParadigm"]
+
+
+@pytest.fixture
+def use_paradigm(monkeypatch):
+    """
+    use_paradigm(paradigm) makes bare imports resolve to that paradigm's
+    files and returns importlib.import_module. Its module names are cleared
+    from sys.modules first; sys.modules and sys.path are restored when the
+    test ends.
+    """
+    def use(paradigm):
+        directory = os.path.join(ROOT, paradigm)
+        for name in os.listdir(directory):
+            if name.endswith(".py"):
+                monkeypatch.setitem(sys.modules, name[:-3], None)
+                del sys.modules[name[:-3]]
+        monkeypatch.syspath_prepend(directory)
+        return importlib.import_module
+    return use
+
+
+@pytest.fixture(params=PARADIGMS)
+def load(request, use_paradigm):
+    """load(name) imports module name from the paradigm under test."""
+    return use_paradigm(request.param)
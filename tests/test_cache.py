@@ -0,0 +1,111 @@
+# test_cache.py
+# Stage keys chain, so a changed stage must rerun itself and every stage
+# after it and nothing before it; the on-disk store must evict the least
+# recently used entries and recompute entries it cannot read.
+import os
+
+import pytest
+
+
+@pytest.fixture
+def cache(load):
+    return load("cache")
+
+
+def run(cache, cache_dir, input_key, stages, max_bytes=1 << 20):
+    """run_stages in either paradigm; the state lives on disk between calls."""
+    if hasattr(cache, "StageCache"):
+        store = None if cache_dir is None else cache.StageCache(cache_dir, max_bytes=max_bytes)
+        return cache.run_stages(store, input_key, stages)
+    return cache.run_stages(cache_dir, input_key, stages, max_bytes=max_bytes)
+
+
+def store_ops(cache, cache_dir, max_bytes):
+    """(put, get) on the raw entry store in either paradigm."""
+    if hasattr(cache, "StageCache"):
+        store = cache.StageCache(cache_dir, max_bytes=max_bytes)
+        return store.put, store.get
+    os.makedirs(cache_dir, exist_ok=True)
+    return (lambda key, value: cache.cache_put(cache_dir, key, value, max_bytes),
+            lambda key: cache.cache_get(cache_dir, key))
+
+
+def entry_file(cache_dir, key):
+    return os.path.join(cache_dir, key + ".pkl.z")
+
+
+def make_stages(calls, scale=2, offset=1):
+    def stage(name, fn):
+        return lambda value: calls.append(name) or fn(value)
+    return [
+        ("load", None, stage("load", lambda _: [1, 2, 3])),
+        ("scale", {"factor": scale}, stage("scale", lambda xs: [x * scale for x in xs])),
+        ("shift", {"offset": offset}, stage("shift", lambda xs: [x + offset for x in xs])),
+    ]
+
+
+def test_changed_params_rerun_that_stage_and_later_ones(cache, tmp_path):
+    cache_dir = str(tmp_path)
+    calls = []
+    assert run(cache, cache_dir, "input", make_stages(calls)) == ([3, 5, 7], None)
+    assert calls == ["load", "scale", "shift"]
+
+    calls.clear()
+    assert run(cache, cache_dir, "input", make_stages(calls)) == ([3, 5, 7], "shift")
+    assert calls == []
+
+    calls.clear()
+    assert run(cache, cache_dir, "input", make_stages(calls, scale=10)) == ([11, 21, 31], "load")
+    assert calls == ["scale", "shift"]
+
+    calls.clear()
+    assert run(cache, cache_dir, "input", make_stages(calls, offset=0)) == ([2, 4, 6], "scale")
+    assert calls == ["shift"]
+
+    calls.clear()
+    assert run(cache, cache_dir, "other input", make_stages(calls)) == ([3, 5, 7], None)
+    assert calls == ["load", "scale", "shift"]
+
+
+def test_no_cache_runs_every_stage(cache):
+    calls = []
+    assert run(cache, None, "input", make_stages(calls)) == ([3, 5, 7], None)
+    assert run(cache, None, "input", make_stages(calls)) == ([3, 5, 7], None)
+    assert calls == ["load", "scale", "shift"] * 2
+
+
+def test_evicts_least_recently_used(cache, tmp_path):
+    cache_dir = str(tmp_path)
+    blob = os.urandom(1000)  # incompressible, so every entry is a little over 1000 bytes
+    put, get = store_ops(cache, cache_dir, max_bytes=2500)
+    put("a", blob)
+    put("b", blob)
+    os.utime(entry_file(cache_dir, "a"), (100, 100))
+    os.utime(entry_file(cache_dir, "b"), (200, 200))
+    assert get("a") == blob  # a is now the most recently used
+    put("c", blob)
+    assert sorted(os.listdir(cache_dir)) == ["a.pkl.z", "c.pkl.z"]
+    assert get("b") is None
+
+
+@pytest.mark.parametrize("damage", ["truncate", "garbage"])
+def test_unreadable_entry_is_discarded_and_recomputed(cache, tmp_path, damage):
+    cache_dir = str(tmp_path)
+    calls = []
+    run(cache, cache_dir, "input", make_stages(calls))
+    key = "input"
+    for name, params, _ in make_stages(calls):
+        key = cache.stage_key(key, name, params)
+    path = entry_file(cache_dir, key)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:len(data) // 2] if damage == "truncate" else b"not a cache entry")
+
+    calls.clear()
+    assert run(cache, cache_dir, "input", make_stages(calls)) == ([3, 5, 7], "scale")
+    assert calls == ["shift"]
+    # the rewritten entry is read back on the next run
+    calls.clear()
+    assert run(cache, cache_dir, "input", make_stages(calls)) == ([3, 5, 7], "shift")
+    assert calls == []
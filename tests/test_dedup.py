@@ -0,0 +1,97 @@
+# test_dedup.py
+# Both paradigms' drop_duplicates must keep the first row of every key
+# however the fingerprints are split between memory, spilled runs and
+# the Bloom filter, and must never drop a row whose key is incomplete.
+import random
+
+import pytest
+
+KEYS = ["Date", "Region", "Product"]
+
+
+@pytest.fixture
+def dedup(load):
+    return load("dedup")
+
+
+def drop(dedup, rows, **options):
+    """(kept rows, dropped count) from either paradigm's drop_duplicates."""
+    if hasattr(dedup, "Deduplicator"):
+        report = {}
+        kept = dedup.drop_duplicates(rows, KEYS, report=report, **options)
+        return kept, report["dropped"]
+    return dedup.drop_duplicates(rows, KEYS, **options)
+
+
+def count_run_writes(dedup, monkeypatch):
+    """Count the sorted runs written to disk (spills and merges)."""
+    calls = []
+    if hasattr(dedup, "Deduplicator"):
+        write_run = dedup.Deduplicator._write_run
+        monkeypatch.setattr(dedup.Deduplicator, "_write_run",
+                            lambda self, fps: calls.append(1) or write_run(self, fps))
+    else:
+        write_run = dedup.write_run
+        monkeypatch.setattr(dedup, "write_run", lambda fps, spill_dir: calls.append(1) or write_run(fps, spill_dir))
+    return calls
+
+
+def make_row(i):
+    return {"Date": f"2025-01-{i % 28 + 1:02d}", "Region": f"R{i // 28}", "Product": "WidgetA", "Sales": str(i)}
+
+
+def reference(rows):
+    seen = set()
+    kept = []
+    for r in rows:
+        key = tuple(r.get(f) for f in KEYS)
+        if any(v in (None, "") for v in key) or key not in seen:
+            kept.append(r)
+            seen.add(key)
+    return kept
+
+
+@pytest.mark.parametrize("bloom_bits", [0, 64, 1 << 20])
+def test_matches_in_memory_reference(dedup, tmp_path, bloom_bits):
+    # 64 bits saturate the filter, so nearly every lookup reaches the runs
+    rng = random.Random(bloom_bits)
+    rows = [make_row(rng.randrange(300)) for _ in range(3000)]
+    kept, dropped = drop(dedup, rows, max_in_memory=7, bloom_bits=bloom_bits, spill_dir=str(tmp_path))
+    expected = reference(rows)
+    assert kept == expected
+    assert dropped == len(rows) - len(expected)
+
+
+def test_runs_merge_beyond_max_runs(dedup, tmp_path, monkeypatch):
+    calls = count_run_writes(dedup, monkeypatch)
+    rows = [make_row(i) for i in range(400)]
+    # every key spills once per 4 new fingerprints; the second pass finds them all on disk
+    kept, dropped = drop(dedup, rows + rows[::-1], max_in_memory=4, spill_dir=str(tmp_path))
+    assert kept == rows
+    assert dropped == 400
+    spills = 400 // 4
+    assert spills > dedup.MAX_RUNS
+    assert len(calls) > spills  # the extra writes are the merged runs
+
+
+def test_rows_without_a_full_key_are_kept(dedup, tmp_path):
+    rows = [
+        {"Date": "2025-01-01", "Region": "North", "Product": "WidgetA"},
+        {"Date": "2025-01-01", "Region": "", "Product": "WidgetA"},
+        {"Date": "2025-01-01", "Region": "", "Product": "WidgetA"},
+        {"Date": None, "Region": "North", "Product": "WidgetA"},
+        {"Date": None, "Region": "North", "Product": "WidgetA"},
+        {"Region": "North", "Product": "WidgetA"},
+        {"Region": "North", "Product": "WidgetA"},
+        {"Date": "2025-01-01", "Region": "North", "Product": "WidgetA"},
+    ]
+    kept, dropped = drop(dedup, rows, max_in_memory=1, spill_dir=str(tmp_path))
+    assert kept == rows[:7]
+    assert dropped == 1
+
+
+def test_key_fields_do_not_run_together(dedup):
+    # without a separator both rows would hash "2025-01-1" + "1North"
+    rows = [{"Date": "2025-01-1", "Region": "1North", "Product": "A"},
+            {"Date": "2025-01-11", "Region": "North", "Product": "A"}]
+    assert drop(dedup, rows) == (rows, 0)
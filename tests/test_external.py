@@ -0,0 +1,56 @@
+# test_external.py
+# Both paradigms' external_group_sum must agree with each other and with
+# the in-memory aggregate: first-seen key order until something spills,
+# key order after.
+import random
+
+import pytest
+
+from conftest import PARADIGMS
+
+
+@pytest.fixture
+def external(load):
+    return load("external")
+
+
+ROWS = [
+    {"Region": "North", "Sales": "1500"},
+    {"Region": "East", "Sales": "200.5"},
+    {"Region": "West", "Sales": "x"},
+    {"Region": "North", "Sales": "10"},
+    {"Region": "South", "Sales": "7"},
+    {"Sales": "3"},
+]
+
+
+def test_first_seen_order_without_spill(external):
+    assert external.external_group_sum(ROWS, "Region", "Sales", max_groups=100) == [
+        {"key": "North", "Sales": 1510.0},
+        {"key": "East", "Sales": 200.5},
+        {"key": "West", "Sales": 0.0},
+        {"key": "South", "Sales": 7.0},
+        {"key": "UNKNOWN", "Sales": 3.0},
+    ]
+
+
+def test_key_order_after_spill(external):
+    assert external.external_group_sum(ROWS, "Region", "Sales", max_groups=2) == [
+        {"key": "East", "Sales": 200.5},
+        {"key": "North", "Sales": 1510.0},
+        {"key": "South", "Sales": 7.0},
+        {"key": "UNKNOWN", "Sales": 3.0},
+        {"key": "West", "Sales": 0.0},
+    ]
+
+
+def test_paradigms_agree_on_many_groups(use_paradigm):
+    rng = random.Random(7)
+    rows = [{"k": rng.choice([None, *map(str, range(300))]), "v": rng.randint(0, 99)} for _ in range(5000)]
+    results = [use_paradigm(p)("external").external_group_sum(rows, "k", "v", max_groups=50) for p in PARADIGMS]
+    assert results[0] == results[1]
+    assert [r["key"] for r in results[0]][-1] is None
+    totals = {}
+    for r in rows:
+        totals[r["k"]] = totals.get(r["k"], 0) + r["v"]
+    assert {r["key"]: r["v"] for r in results[0]} == totals
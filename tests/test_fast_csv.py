@@ -0,0 +1,111 @@
+# test_fast_csv.py
+# The mmap loader must return exactly what csv.DictReader returns.
+import csv
+import os
+import random
+
+import pytest
+
+from conftest import ROOT
+
+
+@pytest.fixture
+def fast_csv(load):
+    return load("fast_csv")
+
+
+def reference(path, columns=None):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        return []
+    keys = [k for k in rows[0] if k is not None]
+    if columns is not None:
+        keys = [c for c in columns if c in keys]
+    return [{k: r.get(k) for k in keys} for r in rows]
+
+
+def random_field(rng):
+    kind = rng.random()
+    if kind < 0.15:
+        return ""
+    if kind < 0.25:
+        # quoted field with a delimiter, an escaped quote or a newline inside
+        inner = rng.choice(["West, Coast", 'Widget ""D""', "two\nlines", "a\r\nb", ""])
+        return f'"{inner}"'
+    if kind < 0.32:
+        # a quote that doesn't start the field is an ordinary character
+        return rng.choice(['5" pipe', 'a"b', 'x""', ' "West', '"ab"c', '"a"b"c'])
+    return rng.choice(["North", "1500", "2025-01-01", "WidgetA", "x y", "0.5"])
+
+
+def random_csv(rng):
+    ncols = rng.randint(1, 5)
+    header = [f"c{i}" for i in range(ncols)]
+    eol = rng.choice(["\n", "\r\n"])
+    lines = [",".join(header)]
+    for _ in range(rng.randint(0, 30)):
+        kind = rng.random()
+        if kind < 0.1:
+            lines.append("")  # blank line
+        elif kind < 0.2:
+            lines.append(",".join(random_field(rng) for _ in range(rng.randint(1, ncols + 2))))
+        else:
+            lines.append(",".join(random_field(rng) for _ in range(ncols)))
+    text = eol.join(lines)
+    if rng.random() < 0.7:
+        text += eol
+    return header, text
+
+
+def write(tmp_path, text, name="input.csv"):
+    path = tmp_path / name
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def test_matches_dictreader_on_random_files(fast_csv, tmp_path, monkeypatch):
+    # small chunks so records also straddle chunk boundaries
+    monkeypatch.setattr(fast_csv, "CHUNK_SIZE", 64)
+    rng = random.Random(20261019)
+    for i in range(500):
+        header, text = random_csv(rng)
+        path = write(tmp_path, text)
+        projections = [None, [header[0]], rng.sample(header, rng.randint(1, len(header)))]
+        for columns in projections:
+            expected = reference(path, columns)
+            assert fast_csv.load_csv_mmap(path, columns=columns) == expected, (text, columns)
+
+
+def test_blank_lines_with_first_column_projected(fast_csv, tmp_path):
+    # no newline at the end: the blank line's empty match used to make the row count add up
+    path = write(tmp_path, "c0,c1\r\n\nWidgetA,North\r\nWidgetB,South")
+    assert fast_csv.load_csv_mmap(path, columns=["c0"]) == [{"c0": "WidgetA"}, {"c0": "WidgetB"}]
+    path = write(tmp_path, "Date\n2025-01-01\n\n2025-01-02", "one_column.csv")
+    assert fast_csv.load_csv_mmap(path) == [{"Date": "2025-01-01"}, {"Date": "2025-01-02"}]
+
+
+def test_columnar_load_matches_rows(fast_csv, tmp_path):
+    path = write(tmp_path, 'Region,Sales\nNorth,1500\n\n"West, Coast",\nSouth,950\n')
+    cols = fast_csv.load_columns_mmap(path, columns=["Region", "Sales"], numeric_columns=["Sales"])
+    assert cols["Region"] == ["North", "West, Coast", "South"]
+    assert list(cols["Sales"])[::2] == [1500.0, 950.0]
+    assert cols["Sales"][1] != cols["Sales"][1]  # missing -> NaN
+
+
+def test_input_csv(fast_csv):
+    path = os.path.join(ROOT, "Data", "input.csv")
+    for columns in (None, ["Date"], ["Region", "Sales"]):
+        assert fast_csv.load_csv_mmap(path, columns=columns) == reference(path, columns)
+
+
+def test_quote_inside_unquoted_field(fast_csv, tmp_path):
+    path = write(tmp_path, 'a,b\n5" pipe,d\nx,y\n')
+    assert fast_csv.load_csv_mmap(path) == [{"a": '5" pipe', "b": "d"}, {"a": "x", "b": "y"}]
+
+
+def test_quoted_field_spanning_many_lines(fast_csv, tmp_path):
+    note = "\n".join(f"line {i}" for i in range(3000))
+    path = write(tmp_path, f'Product,Note\nWidgetA,"{note}"\nWidgetB,short\n')
+    assert fast_csv.load_csv_mmap(path) == reference(path)
+    assert fast_csv.load_csv_mmap(path, columns=["Product"]) == [{"Product": "WidgetA"}, {"Product": "WidgetB"}]
@@ -0,0 +1,95 @@
+# test_nullmask.py
+# Null masks must stay aligned with the rows they describe through every
+# stage that drops or fills rows, and must keep filled values out of the
+# statistics.
+import pytest
+
+ROWS = [
+    {"Region": "North", "Sales": "10"},
+    {"Region": "South", "Sales": ""},
+    {"Region": "", "Sales": "30"},
+    {"Region": "East", "Sales": None},
+    {"Region": "West"},
+    {"Region": "North", "Sales": "50"},
+]
+
+
+@pytest.fixture
+def pipeline(load):
+    return load("pipeline")
+
+
+def fill_masked(pipeline, rows, fill_values):
+    """(rows, masks) after handle_missing, in either paradigm."""
+    if hasattr(pipeline, "handle_missing_masked"):
+        return pipeline.handle_missing_masked(rows, fill_values=fill_values)
+    masks = {}
+    return pipeline.handle_missing(rows, fill_values=fill_values, null_masks=masks), masks
+
+
+def filter_masked(pipeline, rows, condition_fn, masks):
+    if hasattr(pipeline, "filter_rows_masked"):
+        return pipeline.filter_rows_masked(rows, condition_fn, masks)
+    masks = dict(masks)
+    return pipeline.filter_rows(rows, condition_fn, null_masks=masks), masks
+
+
+def test_mask_round_trip(load):
+    nullmask = load("nullmask")
+    flags = [True, False, False, True, True] + [False] * 70 + [True]
+    mask = nullmask.mask_from_flags(flags)
+    assert nullmask.mask_flags(mask, len(flags)) == "".join("1" if f else "0" for f in flags)
+    assert nullmask.mask_indices(mask) == [i for i, f in enumerate(flags) if f]
+    assert nullmask.select_mask(mask, [1, 3, 75, 100]) == 0b0110
+    assert nullmask.mask_from_flags([]) == 0
+
+
+def test_null_masks_count_missing_keys(load):
+    nullmask = load("nullmask")
+    masks = nullmask.null_masks(ROWS, ["Region", "Sales", "Product"])
+    assert masks == {"Region": 0b000100, "Sales": 0b011010, "Product": 0b111111}
+    assert nullmask.any_mask(masks, ["Region", "Sales"]) == 0b011110
+    assert nullmask.mask_counts(masks) == {"Region": 1, "Sales": 3, "Product": 6}
+
+
+def test_handle_missing_accepts_a_generator(pipeline):
+    rows, masks = fill_masked(pipeline, (dict(r) for r in ROWS), {"Sales": 0.0})
+    assert [r["Sales"] for r in rows] == ["10", 0.0, "30", 0.0, 0.0, "50"]
+    assert masks == {"Sales": 0b011010}
+
+
+def test_remove_strategy_reduces_masks(use_paradigm):
+    pipeline = use_paradigm("ImperativeParadigm")("pipeline")
+    masks = {}
+    rows = pipeline.handle_missing(ROWS, strategy="remove", fill_values={"Sales": 0.0},
+                                   required_fields=["Region"], null_masks=masks)
+    assert [r["Region"] for r in rows] == ["North", "South", "East", "West", "North"]
+    # Sales was missing in original rows 1, 3 and 4, now rows 1, 2 and 3
+    assert masks == {"Sales": 0b01110, "Region": 0}
+
+
+def test_masks_follow_filtered_rows(pipeline):
+    rows, masks = fill_masked(pipeline, ROWS, {"Sales": 0.0, "Region": "UNKNOWN"})
+    kept, kept_masks = filter_masked(pipeline, rows, lambda r: r["Region"] != "North", masks)
+    assert [r["Region"] for r in kept] == ["South", "UNKNOWN", "East", "West"]
+    assert kept_masks == {"Sales": 0b1101, "Region": 0b0010}
+
+
+def test_sales_growth_clears_its_mask(use_paradigm):
+    pipeline = use_paradigm("ImperativeParadigm")("pipeline")
+    masks = {"SalesGrowth": 0b11, "Sales": 0b10}
+    rows = pipeline.compute_sales_growth([{"Sales": "2", "PreviousSales": "1"}, {"Sales": "", "PreviousSales": "0"}],
+                                         null_masks=masks)
+    assert [r["SalesGrowth"] for r in rows] == [1.0, 0.0]
+    assert masks == {"SalesGrowth": 0, "Sales": 0b10}
+
+
+def test_statistics_exclude_filled_values(pipeline):
+    rows, masks = fill_masked(pipeline, ROWS, {"Sales": 0.0})
+    stats = pipeline.analyze_statistics(rows, ["Sales"], exclude_masks=masks)["Sales"]
+    assert (stats["count"], stats["mean"], stats["min"]) == (3, 30.0, 10.0)
+    filled = pipeline.analyze_statistics(rows, ["Sales"])["Sales"]
+    assert (filled["count"], filled["mean"], filled["min"]) == (6, 15.0, 0.0)
+    # the out-of-core path skips the same rows
+    streamed = pipeline.analyze_statistics(rows, ["Sales"], exclude_masks=masks, max_in_memory=2)["Sales"]
+    assert streamed == stats
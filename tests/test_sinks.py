@@ -0,0 +1,51 @@
+# test_sinks.py
+# Rerunning with the same run_id must replace that run's rows in every
+# SQLite table, and open_sinks must reject bad names before opening any.
+import os
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def sinks(load):
+    return load("sinks")
+
+
+def write_run(sinks, output_dir, run_id, agg, stats):
+    sink = sinks.open_sinks(["sqlite"], output_dir, run_id)[0]
+    try:
+        sink.write_rows("clean_data", [{"Region": r["key"], "Sales": r["Sales"]} for r in agg], indexes=["Region"])
+        sink.write_aggregate("agg_by_region", agg, key_field="key")
+        sink.write_summary(stats, null_counts={"Sales": 1})
+    finally:
+        sink.close()
+
+
+def table(output_dir, sql):
+    with sqlite3.connect(os.path.join(output_dir, "pipeline.db")) as conn:
+        return sorted(conn.execute(sql).fetchall())
+
+
+def test_rerun_replaces_the_runs_rows(sinks, tmp_path):
+    out = str(tmp_path)
+    write_run(sinks, out, "r1", [{"key": "North", "Sales": 10.0}, {"key": "Mars", "Sales": 1.0}],
+              {"Sales": {"count": 2, "mean": 5.5}, "Other": {"count": 1}})
+    write_run(sinks, out, "r2", [{"key": "East", "Sales": 3.0}], {"Sales": {"count": 1}})
+    write_run(sinks, out, "r1", [{"key": "North", "Sales": 12.0}], {"Sales": {"count": 1}})
+
+    assert table(out, "SELECT run_id, key, Sales FROM agg_by_region") == [
+        ("r1", "North", 12.0), ("r2", "East", 3.0)]
+    assert table(out, "SELECT run_id, Region FROM clean_data") == [("r1", "North"), ("r2", "East")]
+    assert table(out, 'SELECT run_id, "column", stat, value FROM stats') == [
+        ("r1", "Sales", "count", 1.0), ("r2", "Sales", "count", 1.0)]
+
+    write_run(sinks, out, "r1", [], {})
+    assert table(out, "SELECT run_id, key FROM agg_by_region") == [("r2", "East")]
+    assert table(out, "SELECT run_id, Region FROM clean_data") == [("r2", "East")]
+
+
+def test_unknown_sink_name_opens_nothing(sinks, tmp_path):
+    with pytest.raises(ValueError, match="parquet"):
+        sinks.open_sinks(["sqlite", "parquet"], str(tmp_path), "r1")
+    assert not os.path.exists(os.path.join(str(tmp_path), "pipeline.db"))
@@ -0,0 +1,65 @@
+# test_validation.py
+# Both paradigms' compiled schemas must quarantine the same rows, and the
+# iso_date fast paths must agree with parse_date on every input.
+import random
+from datetime import datetime
+
+import pytest
+
+SCHEMA = {
+    "Date": {"type": "date", "min_date": "2000-01-01", "max_date": "2100-12-31"},
+    "Region": {"allowed": ["North", "South", "East", "West"]},
+    "Sales": {"type": "float", "non_negative": True, "max": 5000},
+}
+
+
+@pytest.fixture
+def modules(load):
+    return load("utils"), load("validation")
+
+
+def date_strings(rng):
+    yield from ["2025-01-05", "2025-02-30", "0999-01-01", "05/03/2025", "12/31/2025", "13/13/2025",
+                "05/03/0999", " 2025-01-05", "2025-01- 5", "5/3/2025", "05-03-2025", "abc", "1e10",
+                "٢٠٢٥-٠١-٠٥"]
+    for _ in range(20000):
+        y, m, d = rng.randint(900, 2200), rng.randint(0, 14), rng.randint(0, 33)
+        yield rng.choice([f"{y:04d}-{m:02d}-{d:02d}", f"{d:02d}/{m:02d}/{y:04d}",
+                          f"{m:02d}/{d:02d}/{y:04d}", f"{d:02d}-{m:02d}-{y:04d}"])
+        yield "".join(rng.choice("0123456789/- ") for _ in range(10))
+
+
+def test_iso_date_matches_parse_date(modules):
+    utils, validation = modules
+
+    def reference(value):
+        parsed = utils.parse_date(str(value))
+        try:
+            datetime.strptime(parsed, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            return None
+        return parsed
+
+    for value in date_strings(random.Random(11)):
+        assert validation.iso_date(value) == reference(value), value
+
+
+def test_validate_quarantines_failing_rows(modules):
+    _, validation = modules
+    rows = [
+        {"Date": "2025-01-05", "Region": "North", "Sales": "1500"},
+        {"Date": "05/03/2025", "Region": "Mars", "Sales": "-5"},
+        {"Date": "1999-12-31", "Region": "", "Sales": "abc"},
+        {"Date": "not a date", "Region": "West", "Sales": "6000"},
+        {"Date": "", "Region": "East", "Sales": "inf"},
+        {"Date": "2025-01-05", "Region": "North", "Sales": "1500"},
+    ]
+    result = validation.validate(rows, validation.compile_schema(SCHEMA))
+    valid, quarantined = result[0], result[1]
+    assert valid == [rows[0], rows[5]]
+    assert [r["violations"] for r in quarantined] == [
+        "Region.allowed;Sales.non_negative",
+        "Date.min_date;Sales.type",
+        "Date.type;Sales.max",
+        "Sales.type",
+    ]